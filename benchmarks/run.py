@@ -0,0 +1,242 @@
+"""
+Load-generation and latency benchmarks for the login and trade flows.
+
+Runs the FastAPI app in-process (ASGI transport) and the TCP game server on
+an ephemeral port against a throwaway SQLite file, drives N concurrent
+simulated players through each scenario and writes a JSON report:
+
+    python -m benchmarks.run --players 50 --rounds 20 --output bench.json
+    python -m benchmarks.run --compare bench.json   # diff against a previous run
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class QueryCounter:
+    """Counts SQL statements executed on the given engines."""
+    def __init__(self, *engines):
+        from sqlalchemy import event
+
+        self.count = 0
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+
+class Scenario:
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies: list[float] = []
+        self.errors = 0
+
+    async def timed(self, coro):
+        started = time.perf_counter()
+        try:
+            ok = await coro
+        except Exception:
+            ok = False
+        self.latencies.append(time.perf_counter() - started)
+        if not ok:
+            self.errors += 1
+
+    def report(self, seconds: float, queries: int) -> dict:
+        ops = len(self.latencies)
+        return {
+            "ops": ops,
+            "errors": self.errors,
+            "seconds": round(seconds, 4),
+            "throughput_ops": round(ops / seconds, 2) if seconds else 0.0,
+            "mean_ms": round(statistics.fmean(self.latencies) * 1000, 3) if ops else 0.0,
+            "p50_ms": round(_percentile(self.latencies, 50) * 1000, 3),
+            "p95_ms": round(_percentile(self.latencies, 95) * 1000, 3),
+            "p99_ms": round(_percentile(self.latencies, 99) * 1000, 3),
+            "db_queries": queries,
+            "db_queries_per_op": round(queries / ops, 3) if ops else 0.0,
+        }
+
+
+async def _run_scenario(name, counter, players, rounds, step):
+    scenario = Scenario(name)
+    queries_before = counter.count
+    started = time.perf_counter()
+
+    async def player(index):
+        for round_index in range(rounds):
+            await scenario.timed(step(index, round_index))
+
+    await asyncio.gather(*(player(index) for index in range(players)))
+    return scenario.report(time.perf_counter() - started, counter.count - queries_before)
+
+
+class GameConnection:
+    """Minimal framed-protocol client used to drive the TCP game server."""
+    def __init__(self, reader, writer, codec):
+        self.reader = reader
+        self.writer = writer
+        self.codec = codec
+        self.lock = asyncio.Lock()
+
+    @classmethod
+    async def open(cls, host, port):
+        from server.game.protocol import JsonCodec, CODECS
+
+        reader, writer = await asyncio.open_connection(host, port)
+        hello = {"action": "hello", "framing": "length", "encodings": list(CODECS)}
+        writer.write(JsonCodec.encode(hello) + b"\n")
+        response = json.loads(await reader.readline())
+        return cls(reader, writer, CODECS[response["encoding"]])
+
+    async def request(self, request: dict) -> dict:
+        from server.game.protocol import encode_frame, read_frame
+
+        async with self.lock:
+            self.writer.write(encode_frame(self.codec, request))
+            await self.writer.drain()
+            return self.codec.decode(await read_frame(self.reader, 1 << 24))
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def run_benchmarks(players: int, rounds: int) -> dict:
+    import httpx
+
+    from server.config.sharding import shards
+    from server.db.ledger import credit_ledger
+    from server.db.models.all import init_db
+    from server.game.handlers import GameHandlers
+    from server.game.server import GameServer
+    from server_main import app
+
+    init_db()
+    counter = QueryCounter(*(
+        engine for shard in shards
+        for engine in (*shard.sync_engines, *(async_engine.sync_engine for async_engine in shard.async_engines))
+    ))
+    results = {}
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+            async def http_login(index, round_index):
+                response = await http.post("/api/v1/auth/login", params={"nickname": f"http-{index}"})
+                return response.status_code == 200
+
+            async def http_items(index, round_index):
+                response = await http.get("/api/v1/items")
+                return response.status_code == 200
+
+            results["http_login"] = await _run_scenario("http_login", counter, players, rounds, http_login)
+            results["http_items"] = await _run_scenario("http_items", counter, players, rounds, http_items)
+
+        credit_ledger.start()
+        server = GameServer(GameHandlers(), host="127.0.0.1", port=0)
+        await server.start()
+        port = server._server.sockets[0].getsockname()[1]
+        connections = [await GameConnection.open("127.0.0.1", port) for _ in range(players)]
+        try:
+            async def socket_login(index, round_index):
+                response = await connections[index].request({"action": "login", "nickname": f"tcp-{index}"})
+                return response.get("status") == "ok"
+
+            async def socket_buy_sell(index, round_index):
+                connection, nickname = connections[index], f"tcp-{index}"
+                bought = await connection.request({"action": "buy", "nickname": nickname, "item": "potion"})
+                sold = await connection.request({"action": "sell", "nickname": nickname, "item": "potion"})
+                return bought.get("status") == "ok" and sold.get("status") == "ok"
+
+            results["socket_login"] = await _run_scenario("socket_login", counter, players, rounds, socket_login)
+            results["socket_buy_sell"] = await _run_scenario(
+                "socket_buy_sell", counter, players, rounds, socket_buy_sell
+            )
+        finally:
+            for connection in connections:
+                await connection.close()
+            await server.close()
+            credit_ledger.close()
+
+    return results
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous: dict, current: dict):
+    keys = ("throughput_ops", "p50_ms", "p95_ms", "p99_ms", "db_queries_per_op")
+    for name, stats in current["scenarios"].items():
+        before = previous.get("scenarios", {}).get(name)
+        if before is None:
+            print(f"{name}: new scenario")
+            continue
+        deltas = []
+        for key in keys:
+            old, new = before.get(key, 0), stats.get(key, 0)
+            change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+            deltas.append(f"{key} {old} -> {new} ({change})")
+        print(f"{name}: " + "; ".join(deltas))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=20, help="concurrent simulated players")
+    parser.add_argument("--rounds", type=int, default=10, help="iterations per player and scenario")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--compare", help="previous JSON report to diff against")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Must be set before any server module creates its engines.
+        os.environ["GAME_DB_FILE"] = os.path.join(tmp, "bench.db")
+        os.environ["GAME_EVENT_LOG_DIR"] = os.path.join(tmp, "events")
+        # Every simulated player shares one client address.
+        os.environ.setdefault("GAME_RATE_LIMIT", "0")
+        scenarios = asyncio.run(run_benchmarks(args.players, args.rounds))
+
+    report = {
+        "meta": {
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "players": args.players,
+            "rounds": args.rounds,
+        },
+        "scenarios": scenarios,
+    }
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
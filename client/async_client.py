@@ -0,0 +1,305 @@
+# async_client.py
+
+"""
+Асинхронный клиент игрового сервера для ботов и нагрузочных сценариев.
+
+Не зависит от консоли: login/buy/sell/logout — корутины поверх постоянных
+кадровых соединений. Пул держит несколько сокетов, игроки распределяются
+по ним по хэшу nickname, так что запросы одного игрока всегда идут через
+одно соединение: сервер принимает действия игрока только от соединения,
+на котором был выполнен его login.
+
+    async with GamePool(connections=4) as pool:
+        bot = pool.player("bot-1")
+        await bot.login()
+        await bot.buy("potion")
+"""
+import asyncio
+import random
+import zlib
+
+try:
+    from client.protocol import CODECS, FRAME_HEADER, JsonCodec
+except ImportError:  # запуск как скрипта из каталога client
+    from protocol import CODECS, FRAME_HEADER, JsonCodec
+
+HOST = "127.0.0.1"
+PORT = 65432
+
+
+class AsyncConnection:
+    """
+    Одно кадровое соединение. Запросам присваиваются id, ответы читает
+    отдельная задача и раздаёт ожидающим по id, поэтому через сокет
+    одновременно идёт много запросов.
+
+    Соединение открывается лениво и после обрыва переоткрывается с
+    экспоненциальной задержкой. Запросы, уже отправленные на момент обрыва,
+    завершаются ConnectionError и не повторяются: buy/sell не идемпотентны.
+    """
+
+    def __init__(self, host=HOST, port=PORT, encodings=None, on_reply=None,
+                 backoff=0.1, max_backoff=5.0, max_attempts=8):
+        self.host = host
+        self.port = port
+        self.encodings = list(encodings or CODECS)
+        self.on_reply = on_reply
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+        self.codec = None
+        # Номер открытия соединения; после переподключения вход игроков нужно повторить.
+        self.generation = 0
+        self._reader = None
+        self._writer = None
+        self._read_task = None
+        self._connecting = None
+        self._pending = {}
+        self._next_id = 1
+
+    @property
+    def connected(self):
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def connect(self):
+        """Открывает соединение (одна попытка на всех ожидающих)."""
+        if self.connected:
+            return
+        if self._connecting is None:
+            self._connecting = asyncio.ensure_future(self._connect_with_backoff())
+        try:
+            await asyncio.shield(self._connecting)
+        finally:
+            if self._connecting is not None and self._connecting.done():
+                self._connecting = None
+
+    async def _connect_with_backoff(self):
+        delay = self.backoff
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                await self._open()
+                return
+            except (OSError, ConnectionError):
+                if attempt == self.max_attempts:
+                    raise
+            # Случайная составляющая разводит переподключения многих ботов.
+            await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+            delay = min(delay * 2, self.max_backoff)
+
+    async def _open(self):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        hello = {"action": "hello", "framing": "length", "encodings": self.encodings}
+        writer.write(JsonCodec.encode(hello) + b"\n")
+        await writer.drain()
+        line = await reader.readline()
+        if not line:
+            writer.close()
+            raise ConnectionError("Сервер закрыл соединение")
+        response = JsonCodec.decode(line)
+        if response.get("status") != "ok" or response.get("encoding") not in CODECS:
+            writer.close()
+            raise ConnectionError("Сервер не поддерживает кадровый режим")
+        self.codec = CODECS[response["encoding"]]
+        self.generation += 1
+        self._reader, self._writer = reader, writer
+        self._read_task = asyncio.create_task(self._read_loop(reader))
+
+    async def _read_loop(self, reader):
+        error = ConnectionError("Сервер закрыл соединение")
+        try:
+            while True:
+                header = await reader.readexactly(FRAME_HEADER.size)
+                (size,) = FRAME_HEADER.unpack(header)
+                response = self.codec.decode(await reader.readexactly(size))
+                if self.on_reply is not None:
+                    self.on_reply(response)
+                waiter = self._pending.pop(response.get("id"), None)
+                if waiter is not None and not waiter.done():
+                    waiter.set_result(response)
+        except (asyncio.IncompleteReadError, OSError) as e:
+            error = ConnectionError(str(e) or "Сервер закрыл соединение")
+        except asyncio.CancelledError:
+            error = ConnectionError("Соединение закрыто")
+            raise
+        finally:
+            self._drop(error)
+
+    def _drop(self, error):
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+        pending, self._pending = self._pending, {}
+        for waiter in pending.values():
+            if not waiter.done():
+                waiter.set_exception(error)
+
+    async def request(self, request, timeout=None):
+        """
+        Отправляет запрос и дожидается ответа на него; если задан timeout
+        (секунды) и ответа нет, бросает asyncio.TimeoutError.
+        """
+        await self.connect()
+        request_id = self._next_id
+        self._next_id += 1
+        waiter = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = waiter
+        payload = self.codec.encode(dict(request, id=request_id))
+        try:
+            self._writer.write(FRAME_HEADER.pack(len(payload)) + payload)
+            await self._writer.drain()
+        except (OSError, AttributeError) as e:
+            self._pending.pop(request_id, None)
+            raise ConnectionError(f"Не удалось отправить запрос: {e}") from e
+        try:
+            return await asyncio.wait_for(waiter, timeout)
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def close(self):
+        writer = self._writer
+        if self._read_task is not None:
+            self._read_task.cancel()
+            try:
+                await self._read_task
+            except asyncio.CancelledError:
+                pass
+            self._read_task = None
+        self._drop(ConnectionError("Соединение закрыто"))
+        if writer is not None:
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+
+class CatalogCache:
+    """
+    Копия all_items на клиенте. Сервер добавляет catalog_version к успешным
+    ответам; каталог перезапрашивается только когда версия изменилась.
+    """
+
+    def __init__(self):
+        self.items = {}
+        self.version = None
+        self.stale = True
+        self._refreshing = None
+
+    def observe(self, response):
+        version = response.get("catalog_version")
+        if "all_items" in response:
+            self.items = response["all_items"]
+            self.version = version
+            self.stale = False
+        elif version is not None and version != self.version:
+            self.stale = True
+
+    async def get(self, connection):
+        if self.stale:
+            if self._refreshing is None:
+                self._refreshing = asyncio.ensure_future(connection.request({"action": "catalog"}))
+            refreshing = self._refreshing
+            try:
+                await asyncio.shield(refreshing)
+            finally:
+                if self._refreshing is refreshing and refreshing.done():
+                    self._refreshing = None
+        return self.items
+
+
+class GamePool:
+    """Пул соединений, по которым мультиплексируются игроки."""
+
+    def __init__(self, host=HOST, port=PORT, connections=4, **options):
+        self.catalog = CatalogCache()
+        self.connections = [
+            AsyncConnection(host, port, on_reply=self.catalog.observe, **options) for _ in range(connections)
+        ]
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def connect(self):
+        await asyncio.gather(*(connection.connect() for connection in self.connections))
+
+    async def close(self):
+        await asyncio.gather(*(connection.close() for connection in self.connections))
+
+    def connection_for(self, nickname):
+        # Стабильный хэш: все запросы игрока идут через соединение, на котором выполнен его login.
+        return self.connections[zlib.crc32(nickname.encode("utf-8")) % len(self.connections)]
+
+    async def request(self, nickname, request):
+        return await self.connection_for(nickname).request(dict(request, nickname=nickname))
+
+    async def items(self):
+        """Каталог {item_key: price}; запрашивается заново только после смены версии."""
+        return await self.catalog.get(self.connections[0])
+
+    def player(self, nickname):
+        return AsyncPlayer(self, nickname)
+
+
+class AsyncPlayer:
+    """
+    Состояние одного игрока (баланс, инвентарь) поверх пула. Запросы одного
+    игрока выполняются по очереди, чтобы покупка и продажа не обогнали друг
+    друга на сервере.
+
+    Сервер забывает вход вместе с оборванным соединением, поэтому после
+    переподключения login повторяется перед следующим запросом.
+    """
+
+    def __init__(self, pool, nickname):
+        self.pool = pool
+        self.nickname = nickname
+        self.credits = 0
+        self.items_owned = []
+        self._lock = asyncio.Lock()
+        # generation соединения, на котором выполнен login; None — вход не выполнен.
+        self._logged_in_on = None
+
+    async def _call(self, request):
+        async with self._lock:
+            connection = self.pool.connection_for(self.nickname)
+            if self._logged_in_on is not None and request["action"] != "login":
+                await connection.connect()
+                if connection.generation != self._logged_in_on:
+                    response = await self._send(connection, {"action": "login"})
+                    if response.get("status") != "ok":
+                        return response
+            return await self._send(connection, request)
+
+    async def _send(self, connection, request):
+        response = await connection.request(dict(request, nickname=self.nickname))
+        if response.get("status") == "ok":
+            if "credits" in response:
+                self.credits = response["credits"]
+            if "items_owned" in response:
+                self.items_owned = response["items_owned"]
+            if request["action"] == "login":
+                self._logged_in_on = connection.generation
+            elif request["action"] == "logout":
+                self._logged_in_on = None
+        return response
+
+    async def login(self):
+        return await self._call({"action": "login"})
+
+    async def logout(self):
+        response = await self._call({"action": "logout"})
+        if response.get("status") == "ok":
+            self.credits, self.items_owned = 0, []
+        return response
+
+    async def buy(self, item):
+        return await self._call({"action": "buy", "item": item})
+
+    async def sell(self, item):
+        return await self._call({"action": "sell", "item": item})
+
+    async def inventory(self):
+        return await self._call({"action": "inventory"})
@@ -3,8 +3,13 @@
 import socket
 import json
 
+try:
+    from client.protocol import FramedConnection
+except ImportError:  # запуск как скрипта: python client/client.py
+    from protocol import FramedConnection
+
 HOST = "127.0.0.1"
-PORT = 50007
+PORT = 65432
 
 class GameClient:
     def __init__(self):
@@ -12,21 +17,38 @@ class GameClient:
         self.all_items = {}    # кэш списка предметов, полученный с сервера
         self.credits = 0
         self.items_owned = []
+        self.connection = None
+
+    def connect(self, sock):
+        """
+        Открывает кадровое соединение поверх сокета (handshake с выбором кодека).
+        """
+        self.connection = FramedConnection(sock)
+        self.connection.handshake()
+        return self.connection
 
     def send_request(self, sock, request_data):
         """
-        Отправляет JSON-запрос и читает ответ (одну строку JSON).
+        Отправляет запрос и дожидается ответа на него.
         Возвращает словарь-ответ от сервера.
         """
-        request_str = json.dumps(request_data)
-        sock.sendall((request_str + "\n").encode("utf-8"))
-        response_str = sock.recv(4096).decode("utf-8").strip()
-        if not response_str:
-            return {"status": "error", "error": "Пустой ответ от сервера"}
+        if self.connection is None or self.connection.sock is not sock:
+            self.connect(sock)
         try:
-            return json.loads(response_str)
-        except json.JSONDecodeError:
-            return {"status": "error", "error": f"Ошибка парсинга ответа: {response_str}"}
+            return self.connection.request(request_data)
+        except ConnectionError as e:
+            return {"status": "error", "error": str(e)}
+        except (json.JSONDecodeError, ValueError) as e:
+            return {"status": "error", "error": f"Ошибка парсинга ответа: {e}"}
+
+    def send_requests(self, sock, requests):
+        """
+        Отправляет несколько запросов без ожидания каждого ответа (pipeline).
+        Возвращает ответы в порядке запросов.
+        """
+        if self.connection is None or self.connection.sock is not sock:
+            self.connect(sock)
+        return self.connection.pipeline(requests)
 
     def login(self, sock):
         """
@@ -102,7 +124,10 @@ class GameClient:
         response = self.send_request(sock, request)
         if response.get("status") == "ok":
             self.credits = response.get("credits", self.credits)
-            self.items_owned = response.get("items_owned", self.items_owned)
+            if "items_owned" in response:
+                self.items_owned = response["items_owned"]
+            elif item_name not in self.items_owned:
+                self.items_owned = self.items_owned + [item_name]
             print(f"Куплен предмет {item_name}. Баланс: {self.credits}")
         else:
             print("Ошибка при покупке:", response.get("error", "Неизвестная ошибка"))
@@ -129,7 +154,10 @@ class GameClient:
         response = self.send_request(sock, request)
         if response.get("status") == "ok":
             self.credits = response.get("credits", self.credits)
-            self.items_owned = response.get("items_owned", self.items_owned)
+            if "items_owned" in response:
+                self.items_owned = response["items_owned"]
+            else:
+                self.items_owned = [item for item in self.items_owned if item != item_name]
             print(f"Продан предмет {item_name}. Баланс: {self.credits}")
         else:
             print("Ошибка при продаже:", response.get("error", "Неизвестная ошибка"))
@@ -141,11 +169,15 @@ class GameClient:
             return
         print(f"Ваш баланс: {self.credits}")
 
-    def show_owned_items(self):
-        """Показывает список купленных предметов."""
+    def show_owned_items(self, sock):
+        """Показывает список купленных предметов, запрашивая актуальный инвентарь у сервера."""
         if not self.nickname:
             print("Сначала войдите (login).")
             return
+        response = self.send_request(sock, {"action": "inventory", "nickname": self.nickname})
+        if response.get("status") == "ok":
+            self.items_owned = response.get("items_owned", self.items_owned)
+            self.credits = response.get("credits", self.credits)
         print("У вас есть следующие предметы:", self.items_owned)
 
     def show_all_items(self):
@@ -164,6 +196,7 @@ class GameClient:
         print("Подключение к серверу...")
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
             sock.connect((HOST, PORT))
+            self.connect(sock)
             print("Подключение установлено.")
 
             while True:
@@ -188,7 +221,7 @@ class GameClient:
                 elif cmd == "4" or cmd == "list_all":
                     self.show_all_items()
                 elif cmd == "5" or cmd == "list_owned":
-                    self.show_owned_items()
+                    self.show_owned_items(sock)
                 elif cmd == "6" or cmd == "buy":
                     self.buy_item(sock)
                 elif cmd == "7" or cmd == "sell":
@@ -0,0 +1,118 @@
+# protocol.py
+
+import json
+import struct
+
+try:
+    import msgpack
+except ImportError:  # msgpack необязателен, JSON доступен всегда
+    msgpack = None
+
+FRAME_HEADER = struct.Struct("!I")
+
+
+class JsonCodec:
+    name = "json"
+
+    @staticmethod
+    def encode(message):
+        return json.dumps(message, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    @staticmethod
+    def decode(payload):
+        return json.loads(payload)
+
+
+class MsgpackCodec:
+    name = "msgpack"
+
+    @staticmethod
+    def encode(message):
+        return msgpack.packb(message, use_bin_type=True)
+
+    @staticmethod
+    def decode(payload):
+        return msgpack.unpackb(payload, raw=False)
+
+
+CODECS = {JsonCodec.name: JsonCodec}
+if msgpack is not None:
+    CODECS[MsgpackCodec.name] = MsgpackCodec
+
+
+class FramedConnection:
+    """
+    Соединение с игровым сервером поверх блокирующего сокета.
+
+    После handshake (action=hello) сообщения передаются кадрами
+    «4 байта длины + payload». Каждому запросу присваивается id, поэтому
+    несколько запросов можно отправить сразу (pipeline), а ответы
+    сопоставляются по id в любом порядке. Если сервер не поддерживает
+    кадры, соединение остаётся в построчном режиме JSON.
+    """
+
+    def __init__(self, sock, encodings=None):
+        self.sock = sock
+        self.rfile = sock.makefile("rb")
+        self.encodings = list(encodings or CODECS)
+        self.codec = None
+        self._next_id = 1
+        self._responses = {}
+
+    def handshake(self):
+        hello = {"action": "hello", "framing": "length", "encodings": self.encodings}
+        self.sock.sendall(JsonCodec.encode(hello) + b"\n")
+        response = self._read_line()
+        if response.get("status") == "ok" and response.get("encoding") in CODECS:
+            self.codec = CODECS[response["encoding"]]
+        return self.codec
+
+    def send(self, request):
+        """Отправляет запрос, не дожидаясь ответа. Возвращает id запроса."""
+        request_id = self._next_id
+        self._next_id += 1
+        request = dict(request, id=request_id)
+        if self.codec is None:
+            self.sock.sendall(JsonCodec.encode(request) + b"\n")
+        else:
+            payload = self.codec.encode(request)
+            self.sock.sendall(FRAME_HEADER.pack(len(payload)) + payload)
+        return request_id
+
+    def receive(self, request_id):
+        """
+        Возвращает ответ на запрос request_id, буферизуя чужие ответы.
+        Ответ без id (ошибка кадра, например «Request too large») не
+        относится ни к одному запросу и возвращается сразу.
+        """
+        while request_id not in self._responses:
+            response = self._read_frame() if self.codec is not None else self._read_line()
+            if response.get("id") is None:
+                return response
+            self._responses[response["id"]] = response
+        return self._responses.pop(request_id)
+
+    def request(self, request):
+        return self.receive(self.send(request))
+
+    def pipeline(self, requests):
+        """Отправляет все запросы сразу и возвращает ответы в порядке запросов."""
+        request_ids = [self.send(request) for request in requests]
+        return [self.receive(request_id) for request_id in request_ids]
+
+    def _read_line(self):
+        line = self.rfile.readline()
+        if not line:
+            raise ConnectionError("Сервер закрыл соединение")
+        return json.loads(line)
+
+    def _read_frame(self):
+        header = self._read_exactly(FRAME_HEADER.size)
+        (size,) = FRAME_HEADER.unpack(header)
+        return self.codec.decode(self._read_exactly(size))
+
+    def _read_exactly(self, size):
+        data = self.rfile.read(size)
+        if len(data) < size:
+            raise ConnectionError("Сервер закрыл соединение")
+        return data
@@ -0,0 +1,60 @@
+# game_server_main.py
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from server.cache.accounts import AccountChangeFeed, account_cache
+from server.cache.catalog import catalog
+from server.cache.invalidation import ACCOUNTS, CATALOG, InvalidationListener
+from server.config.settings import ACCOUNT_CHANGES_PRUNE_SECONDS, ACCOUNT_CHANGES_RETAIN, DB_READ_POOL_SIZE, \
+    EVENT_LOG_ENABLED, INVALIDATION_POLL_SECONDS
+from server.config.sharding import shards
+from server.db.eventlog import event_log
+from server.db.ledger import credit_ledger
+from server.db.maintenance import AccountChangePruner
+from server.db.models.all import init_db
+from server.game.handlers import GameHandlers
+from server.game.server import GameServer
+from server.utils.logger import setup_logging
+
+
+async def main():
+    # Handlers run on this executor; one read connection per thread.
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(DB_READ_POOL_SIZE, "game-handler"))
+    init_db()
+    credit_ledger.start()
+    if EVENT_LOG_ENABLED:
+        event_log.start()
+    background = []
+    for shard in shards:
+        invalidations = InvalidationListener(shard.db_file, INVALIDATION_POLL_SECONDS)
+        if shard is shards.catalog:
+            invalidations.subscribe(CATALOG, catalog.invalidate)
+        # Logins, bonuses and trades written by the API workers.
+        account_changes = AccountChangeFeed(shard.AsyncReadSessionLocal)
+        await account_changes.start()
+        account_changes.subscribe(account_cache.invalidate)
+        invalidations.subscribe(ACCOUNTS, account_changes.poll)
+        background.append(asyncio.create_task(invalidations.run()))
+        # Every trade, bonus flush and account creation here adds a row too.
+        background.append(asyncio.create_task(
+            AccountChangePruner(shard.AsyncSessionLocal, ACCOUNT_CHANGES_RETAIN).run(ACCOUNT_CHANGES_PRUNE_SECONDS)
+        ))
+    server = GameServer(GameHandlers())
+    try:
+        await server.serve_forever()
+    finally:
+        for task in background:
+            task.cancel()
+        await asyncio.gather(*background, return_exceptions=True)
+        await server.close()
+        credit_ledger.close()
+        event_log.close()
+        await asyncio.gather(*(shard.dispose() for shard in shards))
+
+
+if __name__ == "__main__":
+    setup_logging()
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -1,6 +1,10 @@
 from fastapi import APIRouter
 from server.api.routers.auth import auth_routers
+from server.api.routers.items import items_routers
+from server.api.routers.leaderboard import leaderboard_routers
 
 v1_router = APIRouter()
 
 v1_router.include_router(auth_routers, prefix="/auth")
+v1_router.include_router(items_routers, prefix="/items")
+v1_router.include_router(leaderboard_routers, prefix="/leaderboard")
@@ -1,13 +1,13 @@
 from typing import Annotated
 
 from fastapi import Depends, APIRouter
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from server.api.schemas.auth import Token, LoginForm
-from server.api.services.auth_service import authenticate_user
+from server.api.schemas.auth import Token, LoginForm, BatchLoginForm, BatchToken, TokenData
+from server.api.services.auth_service import authenticate_user, authenticate_users, logout_user, oauth2_scheme, \
+    get_current_user, get_current_user_read_db, get_token_db
 from server.api.services import account
-from server.config.settings import get_db
-from server.db.models.all import Account
+from server.config.sharding import get_async_shard_db
 
 auth_routers = APIRouter()
 
@@ -15,16 +15,33 @@ auth_routers = APIRouter()
 @auth_routers.post("/login")
 async def login_for_access_token(
         form_data: Annotated[LoginForm, Depends()],
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_shard_db),
 ) -> Token:
     response = await authenticate_user(db, form_data.nickname)
     return response
 
 
-# @auth_routers.get("/users/me")
-# async def my_account_router(
-#         current_user: Annotated[Account, Depends(get_current_user)],
-#         db: Session = Depends(get_db),
-# ):
-#     # response = authenticate_user(db, form_data.nickname)
-#     return "response"
+@auth_routers.post("/login/batch")
+async def batch_login_for_access_tokens(
+        form_data: BatchLoginForm,
+) -> BatchToken:
+    response = await authenticate_users(form_data.nicknames)
+    return response
+
+
+@auth_routers.post("/logout")
+async def logout(
+        token: Annotated[str, Depends(oauth2_scheme)],
+        db: AsyncSession = Depends(get_token_db),
+):
+    response = await logout_user(db, token)
+    return response
+
+
+@auth_routers.get("/users/me")
+async def my_account_router(
+        current_user: Annotated[TokenData, Depends(get_current_user)],
+        db: AsyncSession = Depends(get_current_user_read_db),
+):
+    response = await account.get_account_info(db, current_user)
+    return response
@@ -0,0 +1,13 @@
+from typing import Annotated, Optional
+
+from fastapi import APIRouter, Header
+
+from server.api.services.items import get_items_catalog
+
+items_routers = APIRouter()
+
+
+@items_routers.get("")
+async def get_items(if_none_match: Annotated[Optional[str], Header()] = None):
+    response = await get_items_catalog(if_none_match)
+    return response
@@ -0,0 +1,20 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Query
+
+from server.api.services.leaderboard import get_rank, get_top
+from server.config.settings import LEADERBOARD_MAX_LIMIT
+
+leaderboard_routers = APIRouter()
+
+
+@leaderboard_routers.get("")
+async def get_leaders(limit: Annotated[int, Query(ge=1, le=LEADERBOARD_MAX_LIMIT)] = 10):
+    response = await get_top(limit)
+    return response
+
+
+@leaderboard_routers.get("/{nickname}")
+async def get_player_rank(nickname: str):
+    response = await get_rank(nickname)
+    return response
@@ -0,0 +1,24 @@
+from dataclasses import dataclass, field
+
+# Response payloads built straight from query rows and serialized by
+# server.utils.response_handlers.dumps; slots keep them cheap to create.
+
+
+@dataclass(slots=True)
+class TokenPayload:
+    token: str
+    token_type: str = "bearer"
+
+
+@dataclass(slots=True)
+class InventoryItemPayload:
+    item_key: str
+    name: str
+    price: int
+
+
+@dataclass(slots=True)
+class InventoryPayload:
+    nickname: str
+    credits: int
+    items: list[InventoryItemPayload] = field(default_factory=list)
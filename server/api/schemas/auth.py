@@ -1,15 +1,30 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from server.config.settings import BATCH_LOGIN_MAX_NICKNAMES
 
 
 class LoginForm(BaseModel):
     nickname: str
 
 
+class BatchLoginForm(BaseModel):
+    nicknames: list[str] = Field(min_length=1, max_length=BATCH_LOGIN_MAX_NICKNAMES)
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str
 
 
+class BatchToken(BaseModel):
+    tokens: dict[str, str]
+    token_type: str
+
+
+class TokenData(BaseModel):
+    nickname: str
+
+
 class User(BaseModel):
     nickname: str
     credits: int
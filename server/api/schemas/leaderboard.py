@@ -0,0 +1,8 @@
+from dataclasses import dataclass
+
+
+@dataclass(slots=True)
+class LeaderboardEntry:
+    rank: int
+    nickname: str
+    credits: int
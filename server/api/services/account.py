@@ -1,19 +1,29 @@
-from fastapi.responses import JSONResponse
+from fastapi import HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
-from server.db.models.all import Account
-from server.utils.exception_handlers import handle_exceptions
+from server.api.schemas.account import InventoryItemPayload, InventoryPayload
+from server.api.schemas.auth import TokenData
+from server.cache.catalog import catalog
+from server.config.sharding import shards
+from server.db.crud.account import get_user_by_nickname
+from server.utils.response_handlers import FastJSONResponse
 
 
-@handle_exceptions
-async def get_account_info(db, current_user: Account) -> JSONResponse:
-    items = current_user.items
-    creds = current_user.credits
-
-    return JSONResponse(
-        content={
-            "items": items,
-            "credits": creds,
-        },
-        status_code=200
-    )
-
+async def get_account_info(db: AsyncSession, current_user: TokenData) -> FastJSONResponse:
+    """
+    Balance and inventory with names and prices. Served from the account
+    cache (one joined query on a miss); names and prices come from the
+    catalog snapshot.
+    """
+    nickname = current_user.nickname
+    account = await get_user_by_nickname(db, nickname)
+    if account is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Account not found")
+    snapshot = catalog.peek() or await run_in_threadpool(catalog.get, shards.catalog.ReadSessionLocal)
+    items = [
+        InventoryItemPayload(item_key, snapshot.items[item_key]["name"], snapshot.items[item_key]["price"])
+        for item_key in account.item_keys if item_key in snapshot.items
+    ]
+    payload = InventoryPayload(nickname, account.credits, items)
+    return FastJSONResponse(content=payload, status_code=status.HTTP_200_OK)
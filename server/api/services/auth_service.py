@@ -1,29 +1,28 @@
+import asyncio
 import random
-from datetime import timedelta
+from datetime import timedelta, timezone
 from typing import Annotated
 
-import jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jwt.exceptions import InvalidTokenError
-from sqlalchemy.orm import Session
-from starlette.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
-from server.config.security import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, generate_access_token
+from server.api.schemas.account import TokenPayload
+from server.api.schemas.auth import TokenData
+from server.cache.revocation import revoked_tokens
+from server.config.security import ACCESS_TOKEN_EXPIRE_MINUTES, generate_access_token, decode_access_token
 from server.config.settings import MIN_CREDITS, MAX_CREDITS
-from server.db.crud.account import get_user_by_nickname, create_user_with_nickname, get_token_by_account, update_token, \
-    create_access_token
-from server.db.models.all import Token
-from server.utils.exception_handlers import handle_exceptions
+from server.config.sharding import Shard, shards
+from server.utils.response_handlers import FastJSONResponse
+from server.db.crud.account import login_user, login_users, revoke_token
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
 
-@handle_exceptions
-async def authenticate_user(db: Session, nickname: str) -> JSONResponse:
-    user = await get_or_create_user(db, nickname)
-
-    if not user:
+async def authenticate_user(db: AsyncSession, nickname: str) -> FastJSONResponse:
+    if not nickname:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Some Error occurred!",
@@ -32,44 +31,95 @@ async def authenticate_user(db: Session, nickname: str) -> JSONResponse:
 
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     generated_access_token = generate_access_token(
-        data={"user": user.nickname}, expires_delta=access_token_expires
+        data={"user": nickname}, expires_delta=access_token_expires
+    )
+    bonus = random.randint(MIN_CREDITS, MAX_CREDITS)
+    login = await login_user(db, nickname, bonus, generated_access_token, access_token_expires)
+    return FastJSONResponse(content=TokenPayload(login.token), status_code=status.HTTP_200_OK)
+
+
+async def authenticate_users(nicknames: list[str]) -> FastJSONResponse:
+    nicknames = list(dict.fromkeys(nickname for nickname in nicknames if nickname))
+    if not nicknames:
+        raise ValueError("No nicknames given")
+
+    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    # Signing tens of thousands of tokens is CPU-bound; keep it off the event loop.
+    logins = await run_in_threadpool(_sign_logins, nicknames, access_token_expires)
+    # Shards have independent writer locks, so their batches commit concurrently.
+    await asyncio.gather(*(
+        _login_shard(shard, {nickname: logins[nickname] for nickname in group}, access_token_expires)
+        for shard, group in shards.group(logins).items()
+    ))
+    return FastJSONResponse(
+        content={"tokens": {nickname: token for nickname, (_, token) in logins.items()}, "token_type": "bearer"},
+        status_code=status.HTTP_200_OK,
+    )
+
+
+async def _login_shard(shard: Shard, logins: dict[str, tuple[int, str]], expires_delta: timedelta):
+    async with shard.AsyncSessionLocal() as db:
+        await login_users(db, logins, expires_delta)
+
+
+def _sign_logins(nicknames: list[str], expires_delta: timedelta) -> dict[str, tuple[int, str]]:
+    return {
+        nickname: (
+            random.randint(MIN_CREDITS, MAX_CREDITS),
+            generate_access_token(data={"user": nickname}, expires_delta=expires_delta),
+        )
+        for nickname in nicknames
+    }
+
+
+async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]) -> TokenData:
+    """
+    Validates the bearer token locally (signature, exp, revocation set);
+    no database access on the happy path.
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
     )
-    token = get_token_by_account(db, user.nickname)
-
-    if not token:
-        token = create_access_token(db, generated_access_token, access_token_expires)
-    else:
-        token = update_token(db, token, generated_access_token, access_token_expires)
-    return JSONResponse(content={"token": token.token, "token_type": "bearer"}, status_code=status.HTTP_200_OK)
-
-
-async def get_or_create_user(db: Session, nickname: str):
-    user = get_user_by_nickname(db, nickname)
-    if not user:
-        bonus = random.randint(MIN_CREDITS, MAX_CREDITS)
-        user = create_user_with_nickname(db, nickname, bonus)
-        return user
-    return user
-
-
-# async def get_current_user(db: Session, token: Annotated[str, Depends(oauth2_scheme)]):
-#     credentials_exception = HTTPException(
-#         status_code=status.HTTP_401_UNAUTHORIZED,
-#         detail="Could not validate credentials",
-#         headers={"WWW-Authenticate": "Bearer"},
-#     )
-#     try:
-#         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-#         username = payload.get("sub")
-#         if username is None:
-#             raise credentials_exception
-#         token_data = TokenData(username=username)
-#     except InvalidTokenError:
-#         raise credentials_exception
-#     user = get_user_by_nickname(db, nickname=token_data.username)
-#     if user is None:
-#         raise credentials_exception
-#     return user
+    try:
+        payload = decode_access_token(token)
+    except InvalidTokenError:
+        raise credentials_exception
+    nickname = payload.get("user")
+    if nickname is None or token in revoked_tokens:
+        raise credentials_exception
+    return TokenData(nickname=nickname)
+
+
+async def get_current_user_read_db(current_user: Annotated[TokenData, Depends(get_current_user)]):
+    """Read session on the shard owning the authenticated account."""
+    async with shards.for_nickname(current_user.nickname).AsyncReadSessionLocal() as db:
+        yield db
+
+
+async def get_token_db(token: Annotated[str, Depends(oauth2_scheme)]):
+    """Write session on the shard of the token's account (shard 0 for undecodable tokens)."""
+    try:
+        nickname = decode_access_token(token).get("user")
+    except InvalidTokenError:
+        nickname = None
+    shard = shards.for_nickname(nickname) if isinstance(nickname, str) else shards.catalog
+    async with shard.AsyncSessionLocal() as db:
+        yield db
+
+
+async def logout_user(db: AsyncSession, token: str) -> FastJSONResponse:
+    expires_at = await revoke_token(db, token)
+    if expires_at is None:
+        # Undecodable, unknown, expired and swept, or already revoked.
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or already revoked token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    revoked_tokens.add(token, expires_at.replace(tzinfo=timezone.utc).timestamp())
+    return FastJSONResponse(content={"message": "Logged out"}, status_code=status.HTTP_200_OK)
 
 
 # class SecurityService:
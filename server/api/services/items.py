@@ -0,0 +1,24 @@
+from typing import Optional
+
+from fastapi import Response, status
+from starlette.concurrency import run_in_threadpool
+
+from server.cache.catalog import catalog
+from server.config.settings import ReadSessionLocal
+
+
+async def get_items_catalog(if_none_match: Optional[str]) -> Response:
+    snapshot = catalog.peek() or await run_in_threadpool(catalog.get, ReadSessionLocal)
+    headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+
+    if if_none_match and _etag_matches(snapshot.etag, if_none_match):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
+
+
+def _etag_matches(etag: str, if_none_match: str) -> bool:
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
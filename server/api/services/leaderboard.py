@@ -0,0 +1,21 @@
+from fastapi import HTTPException, status
+
+from server.api.schemas.leaderboard import LeaderboardEntry
+from server.cache.leaderboard import leaderboard
+from server.utils.response_handlers import FastJSONResponse
+
+
+async def get_top(limit: int) -> FastJSONResponse:
+    entries = [LeaderboardEntry(rank, nickname, credits) for rank, nickname, credits in leaderboard.top(limit)]
+    return FastJSONResponse(content={"leaders": entries}, status_code=status.HTTP_200_OK)
+
+
+async def get_rank(nickname: str) -> FastJSONResponse:
+    found = leaderboard.rank(nickname)
+    if found is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Account not found")
+    rank, credits = found
+    return FastJSONResponse(
+        content=LeaderboardEntry(rank, nickname, credits),
+        status_code=status.HTTP_200_OK,
+    )
@@ -0,0 +1,234 @@
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Iterable, Optional
+
+from sqlalchemy import func, select
+
+from server.cache.invalidation import process_origin
+from server.config.settings import ACCOUNT_CACHE_MAX_ENTRIES, ACCOUNT_CACHE_TTL_SECONDS, ACCOUNT_CHANGES_BATCH
+from server.db.models.all import AccountChange
+from server.utils.metrics import account_cache_evictions_total, account_cache_hits_total, account_cache_misses_total
+
+
+class AccountRecord:
+    """Balance (including credits still buffered in the ledger) and owned item keys of one account."""
+    __slots__ = ("nickname", "credits", "item_keys", "expires_at")
+
+    def __init__(self, nickname: str, credits: int, item_keys: tuple, expires_at: float):
+        self.nickname = nickname
+        self.credits = credits
+        self.item_keys = item_keys
+        self.expires_at = expires_at
+
+
+class AccountCache:
+    """
+    LRU of hot accounts (nickname -> AccountRecord) with a TTL.
+
+    Credit and ownership changes made by this process write through to the
+    cached record (credit ledger, trades, account creation); changes made by
+    other processes evict it through AccountChangeFeed, and the TTL is only a
+    backstop. `item_keys` is replaced, never mutated, so readers may hold on
+    to it.
+
+    A miss is filled inside `filling(nickname)` and writers of this process
+    run their transaction and write-through inside `changing(nickname)`: a
+    fill that overlaps a change or an eviction of the same nickname may have
+    read around it, so its result is returned uncached.
+    """
+    def __init__(self, ttl: float = ACCOUNT_CACHE_TTL_SECONDS, max_entries: int = ACCOUNT_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._records: OrderedDict[str, AccountRecord] = OrderedDict()
+        # nickname -> [fills and changes in flight, version, changes in flight]
+        self._tracked: dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def get(self, nickname: str) -> Optional[AccountRecord]:
+        with self._lock:
+            record = self._records.get(nickname)
+            if record is not None:
+                if record.expires_at >= time.monotonic():
+                    self._records.move_to_end(nickname)
+                    account_cache_hits_total.inc()
+                    return record
+                del self._records[nickname]
+        account_cache_misses_total.inc()
+        return None
+
+    def peek(self, nickname: str) -> Optional[AccountRecord]:
+        """Cached record without touching recency or the counters."""
+        return self._records.get(nickname)
+
+    def put(self, nickname: str, credits: int, item_keys: Iterable[str], fill: Optional["Fill"] = None) -> AccountRecord:
+        record = AccountRecord(nickname, credits, tuple(item_keys), time.monotonic() + self.ttl)
+        evicted = 0
+        with self._lock:
+            if fill is not None and fill.stale:
+                return record
+            self._records[nickname] = record
+            self._records.move_to_end(nickname)
+            while len(self._records) > self.max_entries:
+                self._records.popitem(last=False)
+                evicted += 1
+        if evicted:
+            account_cache_evictions_total.inc(evicted)
+        return record
+
+    @contextmanager
+    def filling(self, nickname: str):
+        """Yields a Fill whose `put` caches the record read by a miss unless `nickname` changed meanwhile."""
+        with self._lock:
+            state = self._track(nickname)
+            fill = Fill(self, nickname, state)
+        try:
+            yield fill
+        finally:
+            with self._lock:
+                self._untrack(nickname, state)
+
+    @contextmanager
+    def changing(self, nickname: str):
+        """Brackets a write of `nickname`'s balance or items together with its write-through."""
+        with self._lock:
+            state = self._track(nickname)
+            state[1] += 1
+            state[2] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                state[1] += 1
+                state[2] -= 1
+                self._untrack(nickname, state)
+
+    def _track(self, nickname: str) -> list:
+        # Caller holds the lock.
+        state = self._tracked.get(nickname)
+        if state is None:
+            state = self._tracked[nickname] = [0, 0, 0]
+        state[0] += 1
+        return state
+
+    def _untrack(self, nickname: str, state: list):
+        state[0] -= 1
+        if not state[0]:
+            del self._tracked[nickname]
+
+    def _changed(self, nickname: str):
+        state = self._tracked.get(nickname)
+        if state is not None:
+            state[1] += 1
+
+    def add_credits(self, nickname: str, delta: int):
+        with self._lock:
+            record = self._records.get(nickname)
+            if record is not None:
+                record.credits += delta
+
+    def apply_trade(self, nickname: str, delta: int, item_key: str, owned: bool):
+        """
+        Credits paid (negative) or received by a trade and the item gained
+        (`owned`) or lost. Applied as a delta so concurrent trades commute.
+        """
+        with self._lock:
+            record = self._records.get(nickname)
+            if record is None:
+                return
+            record.credits += delta
+            if owned and item_key not in record.item_keys:
+                record.item_keys = record.item_keys + (item_key,)
+            elif not owned:
+                record.item_keys = tuple(key for key in record.item_keys if key != item_key)
+
+    def discard(self, nickname: str):
+        with self._lock:
+            self._changed(nickname)
+            self._records.pop(nickname, None)
+
+    def invalidate(self, nicknames: Iterable[str]):
+        with self._lock:
+            for nickname in nicknames:
+                self._changed(nickname)
+                self._records.pop(nickname, None)
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+
+class Fill:
+    """One miss being filled; see AccountCache.filling."""
+    __slots__ = ("cache", "nickname", "state", "seen")
+
+    def __init__(self, cache: AccountCache, nickname: str, state: list):
+        self.cache = cache
+        self.nickname = nickname
+        self.state = state
+        self.seen = state[1]
+
+    @property
+    def stale(self) -> bool:
+        # Read under the cache lock.
+        return self.state[1] != self.seen or self.state[2] > 0
+
+    def put(self, credits: int, item_keys: Iterable[str]) -> AccountRecord:
+        return self.cache.put(self.nickname, credits, item_keys, fill=self)
+
+
+class AccountChangeFeed:
+    """
+    Follows one shard's account_changes table and hands the nicknames changed
+    by other processes since the last read to the subscribers (sync or async
+    callables taking a list). `poll` is meant to be an ACCOUNTS subscriber of the shard's
+    InvalidationListener, so it only queries after a writer published.
+    """
+    def __init__(self, session_factory, batch_size: int = ACCOUNT_CHANGES_BATCH):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.last_id: Optional[int] = None
+        self._subscribers: list[Callable] = []
+
+    def subscribe(self, callback: Callable):
+        self._subscribers.append(callback)
+
+    async def start(self):
+        """Skips changes committed before this process started."""
+        async with self.session_factory() as db:
+            self.last_id = await db.scalar(select(func.max(AccountChange.id))) or 0
+
+    async def poll(self) -> int:
+        if self.last_id is None:
+            await self.start()
+            return 0
+        origin = process_origin()
+        changed = set()
+        while True:
+            async with self.session_factory() as db:
+                rows = (await db.execute(
+                    select(AccountChange.id, AccountChange.nickname, AccountChange.origin)
+                    .where(AccountChange.id > self.last_id)
+                    .order_by(AccountChange.id)
+                    .limit(self.batch_size)
+                )).all()
+            if rows:
+                self.last_id = rows[-1].id
+                changed.update(row.nickname for row in rows if row.origin != origin)
+            if len(rows) < self.batch_size:
+                break
+        if changed:
+            nicknames = list(changed)
+            for callback in self._subscribers:
+                result = callback(nicknames)
+                if inspect.isawaitable(result):
+                    await result
+        return len(changed)
+
+
+account_cache = AccountCache()
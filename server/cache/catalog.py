@@ -0,0 +1,71 @@
+import hashlib
+import threading
+from typing import NamedTuple, Optional
+
+from sqlalchemy import event
+
+from server.cache.invalidation import CATALOG, publish
+from server.db.models.all import ItemMaster
+from server.utils.response_handlers import dumps
+
+
+class CatalogSnapshot(NamedTuple):
+    version: int
+    # item_key -> {"name": ..., "price": ...}; shared, treat as read-only.
+    items: dict
+    body: bytes
+    etag: str
+
+
+class CatalogCache:
+    """
+    Process-wide, versioned copy of items_master with its JSON body and ETag
+    computed once per version.
+    """
+    def __init__(self):
+        self.version = 0
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self.version += 1
+        self._snapshot = None
+
+    def peek(self) -> Optional[CatalogSnapshot]:
+        return self._snapshot
+
+    def get(self, session_factory) -> CatalogSnapshot:
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+        with self._lock:
+            if self._snapshot is not None:
+                return self._snapshot
+            version = self.version
+            session = session_factory()
+            try:
+                items = {
+                    item.item_key: {"name": item.name, "price": item.price}
+                    for item in session.query(ItemMaster).all()
+                }
+            finally:
+                session.close()
+            body = dumps(items)
+            etag = '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+            snapshot = CatalogSnapshot(version, items, body, etag)
+            # Do not publish a snapshot that was invalidated while loading.
+            if self.version == version:
+                self._snapshot = snapshot
+            return snapshot
+
+
+catalog = CatalogCache()
+
+
+@event.listens_for(ItemMaster, "after_insert")
+@event.listens_for(ItemMaster, "after_update")
+@event.listens_for(ItemMaster, "after_delete")
+def _invalidate_catalog(mapper, connection, target):
+    catalog.invalidate()
+    # Other worker processes pick this up through the invalidation listener.
+    publish(connection, CATALOG)
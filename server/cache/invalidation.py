@@ -0,0 +1,137 @@
+import asyncio
+import inspect
+import logging
+import os
+import secrets
+import sqlite3
+from collections import defaultdict
+from typing import Callable
+
+from sqlalchemy import text
+from sqlalchemy.dialects.sqlite import insert
+
+from server.db.models.all import AccountChange, CacheVersion
+
+logger = logging.getLogger(__name__)
+
+CATALOG = "catalog"
+REVOCATIONS = "revocations"
+# Rows were appended to account_changes.
+ACCOUNTS = "accounts"
+
+_record_account_change = insert(AccountChange.__table__)
+
+
+def publish_statement(topic: str):
+    return insert(CacheVersion.__table__).values(topic=topic, version=1).on_conflict_do_update(
+        index_elements=["topic"], set_={"version": text("cache_versions.version + 1")}
+    )
+
+
+def publish(connection, topic: str):
+    """
+    Bumps `topic`'s version on `connection` (a Connection or Session), inside
+    the caller's transaction, so other processes see it together with the data.
+    """
+    connection.execute(publish_statement(topic))
+
+
+def _new_origin():
+    global _origin
+    _origin = secrets.randbits(62)
+
+
+_new_origin()
+# A forked worker must not share its parent's id.
+os.register_at_fork(after_in_child=_new_origin)
+
+
+def process_origin() -> int:
+    """
+    Random id of this process, written with its account changes so its own
+    followers can skip them. Not the pid: containers sharing the database
+    file can all run as pid 1.
+    """
+    return _origin
+
+
+def _account_change_rows(nicknames) -> list[dict]:
+    origin = process_origin()
+    return [{"nickname": nickname, "origin": origin} for nickname in nicknames]
+
+
+def publish_account_changes(connection, nicknames):
+    """Records changed accounts and bumps ACCOUNTS inside the caller's (sync) transaction."""
+    connection.execute(_record_account_change, _account_change_rows(nicknames))
+    connection.execute(publish_statement(ACCOUNTS))
+
+
+async def publish_account_changes_async(db, nicknames):
+    """Async-session form of publish_account_changes."""
+    await db.execute(_record_account_change, _account_change_rows(nicknames))
+    await db.execute(publish_statement(ACCOUNTS))
+
+
+class InvalidationListener:
+    """
+    Keeps per-process caches coherent across worker processes.
+
+    Polls `PRAGMA data_version` on a private connection; it only changes when
+    another connection commits, and then the few rows of cache_versions are
+    compared with the last seen versions and subscribers of changed topics
+    are called (sync callbacks or coroutine functions).
+    """
+    def __init__(self, db_file: str, interval: float):
+        self.db_file = db_file
+        self.interval = interval
+        self._subscribers: dict[str, list[Callable]] = defaultdict(list)
+        self._versions: dict[str, int] | None = None
+        self._data_version: int | None = None
+        self._conn: sqlite3.Connection | None = None
+
+    def subscribe(self, topic: str, callback: Callable):
+        self._subscribers[topic].append(callback)
+
+    def poll(self) -> list[str]:
+        """Returns the topics whose version changed since the previous poll."""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        (data_version,) = self._conn.execute("PRAGMA data_version").fetchone()
+        if data_version == self._data_version:
+            return []
+        self._data_version = data_version
+        try:
+            versions = dict(self._conn.execute("SELECT topic, version FROM cache_versions").fetchall())
+        except sqlite3.OperationalError:
+            # Schema not created yet.
+            return []
+        previous, self._versions = self._versions, versions
+        if previous is None:
+            return []
+        return [topic for topic, version in versions.items() if previous.get(topic) != version]
+
+    async def notify(self, topics: list[str]):
+        for topic in topics:
+            for callback in self._subscribers.get(topic, ()):
+                try:
+                    result = callback()
+                    if inspect.isawaitable(result):
+                        await result
+                except Exception:
+                    logger.exception("Invalidation callback for %r failed", topic)
+
+    async def run(self):
+        try:
+            while True:
+                try:
+                    topics = await asyncio.to_thread(self.poll)
+                except sqlite3.Error:
+                    logger.exception("Invalidation poll failed")
+                    topics = []
+                if topics:
+                    await self.notify(topics)
+                await asyncio.sleep(self.interval)
+        finally:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import threading
+from bisect import bisect_left, insort
+from itertools import islice
+from typing import Optional
+
+from sqlalchemy import select
+
+from server.config.settings import SQL_IN_CHUNK_SIZE
+from server.db.models.all import Account
+
+try:
+    from sortedcontainers import SortedList
+except ImportError:  # sortedcontainers is optional; inserts degrade to O(n).
+    SortedList = None
+
+logger = logging.getLogger(__name__)
+
+
+class _BisectList:
+    """Sorted list on a plain Python list, for when sortedcontainers is missing."""
+    def __init__(self, iterable=()):
+        self._items = sorted(iterable)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def add(self, value):
+        insort(self._items, value)
+
+    def remove(self, value):
+        del self._items[bisect_left(self._items, value)]
+
+    def bisect_left(self, value) -> int:
+        return bisect_left(self._items, value)
+
+
+def _sorted_list(iterable=()):
+    return SortedList(iterable) if SortedList is not None else _BisectList(iterable)
+
+
+class Leaderboard:
+    """
+    In-memory ranking of accounts by credits, richest first (ties by nickname).
+
+    Keeps nickname -> credits and an order-statistics list of
+    (-credits, nickname), so updates, rank-of and the start of a top-N slice
+    are O(log n). The board is built from the database (through the credits
+    index) by `rebuild` and then kept current by the credit-change hooks of
+    this process and by `refresh` for accounts changed by other processes
+    (see `follower`); until it has been loaded the hooks are no-ops, so
+    processes that never serve the leaderboard pay nothing. Balances changed
+    while a rebuild or refresh reads are journaled and win over what it read.
+    """
+    def __init__(self):
+        self.loaded = False
+        self._credits: dict[str, int] = {}
+        self._order = _sorted_list()
+        self._journals: list[dict[str, int]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._credits)
+
+    def set(self, nickname: str, credits: int):
+        if not self.loaded:
+            return
+        with self._lock:
+            self._set(nickname, credits)
+
+    def add(self, nickname: str, delta: int):
+        """Applies a credit delta; unknown accounts are left to the next rebuild."""
+        if not self.loaded or not delta:
+            return
+        with self._lock:
+            current = self._credits.get(nickname)
+            if current is not None:
+                self._set(nickname, current + delta)
+
+    def _set(self, nickname: str, credits: int):
+        for journal in self._journals:
+            # Absolute values, so replaying cannot double-count a delta the
+            # rebuild already read from the database or the ledger.
+            journal[nickname] = credits
+        current = self._credits.get(nickname)
+        if current == credits:
+            return
+        if current is not None:
+            self._order.remove((-current, nickname))
+        self._credits[nickname] = credits
+        self._order.add((-credits, nickname))
+
+    def top(self, limit: int) -> list[tuple[int, str, int]]:
+        """[(rank, nickname, credits)] for the `limit` richest accounts."""
+        with self._lock:
+            return [
+                (rank, nickname, -negated)
+                for rank, (negated, nickname) in enumerate(islice(self._order, limit), start=1)
+            ]
+
+    def rank(self, nickname: str) -> Optional[tuple[int, int]]:
+        """(1-based rank, credits) of `nickname`, or None if unknown."""
+        with self._lock:
+            credits = self._credits.get(nickname)
+            if credits is None:
+                return None
+            return self._order.bisect_left((-credits, nickname)) + 1, credits
+
+    def rebuild(self, session_factories, pending=None, batch_size: int = 10000) -> int:
+        """
+        Reloads the board from `accounts` on every shard, in credits order.
+        `pending(nickname)` adds credits accepted but not yet written (the
+        credit ledger).
+        """
+        journal = {}
+        with self._lock:
+            self._journals.append(journal)
+        try:
+            credits = {}
+            for session_factory in session_factories:
+                session = session_factory()
+                try:
+                    rows = session.execute(
+                        select(Account.nickname, Account.credits)
+                        .order_by(Account.credits.desc(), Account.nickname)
+                        .execution_options(yield_per=batch_size)
+                    )
+                    for nickname, balance in rows:
+                        credits[nickname] = (balance or 0) + (pending(nickname) if pending else 0)
+                finally:
+                    session.close()
+            order = _sorted_list((-balance, nickname) for nickname, balance in credits.items())
+        except Exception:
+            with self._lock:
+                self._journals.remove(journal)
+            raise
+
+        with self._lock:
+            self._journals.remove(journal)
+            self._credits, self._order = credits, order
+            for nickname, balance in journal.items():
+                self._set(nickname, balance)
+            self.loaded = True
+        logger.info("Leaderboard rebuilt with %d accounts", len(credits))
+        return len(credits)
+
+    def refresh(self, session_factory, nicknames, pending=None, chunk_size: int = SQL_IN_CHUNK_SIZE) -> int:
+        """Re-reads the balances of `nicknames` from one shard; `pending` as for `rebuild`."""
+        if not self.loaded or not nicknames:
+            return 0
+        nicknames = list(nicknames)
+        journal = {}
+        with self._lock:
+            self._journals.append(journal)
+        credits = {}
+        try:
+            session = session_factory()
+            try:
+                for start in range(0, len(nicknames), chunk_size):
+                    chunk = nicknames[start:start + chunk_size]
+                    for nickname, balance in session.execute(
+                        select(Account.nickname, Account.credits).where(Account.nickname.in_(chunk))
+                    ):
+                        credits[nickname] = (balance or 0) + (pending(nickname) if pending else 0)
+            finally:
+                session.close()
+        finally:
+            with self._lock:
+                self._journals.remove(journal)
+                for nickname, balance in credits.items():
+                    if nickname not in journal:
+                        self._set(nickname, balance)
+        return len(credits)
+
+    def follower(self, session_factory, pending=None):
+        """AccountChangeFeed subscriber that refreshes the changed accounts of its shard."""
+        async def refresh(nicknames):
+            await asyncio.to_thread(self.refresh, session_factory, nicknames, pending)
+        return refresh
+
+    async def run(self, session_factories, interval: float, pending=None):
+        """Periodic rebuild; a backstop for changes the followers missed."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.rebuild, session_factories, pending)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Failed to rebuild the leaderboard")
+
+
+leaderboard = Leaderboard()
@@ -0,0 +1,82 @@
+import asyncio
+import hashlib
+import logging
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+
+from server.db.models.all import Token
+
+logger = logging.getLogger(__name__)
+
+
+class RevocationSet:
+    """
+    In-process set of revoked tokens, keyed by an 8-byte digest of the token.
+
+    Entries are kept until the token's own expiry, so a revoked token stays
+    rejected even after its row is replaced or swept from the tokens table.
+    """
+    def __init__(self):
+        self._revoked: dict[bytes, float] = {}
+        self._refresh_requested: asyncio.Event | None = None
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        return hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+
+    def __contains__(self, token: str) -> bool:
+        return self.digest(token) in self._revoked
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+    def add(self, token: str, expires_at: float):
+        self._revoked[self.digest(token)] = expires_at
+
+    def prune(self, now: float | None = None):
+        now = time.time() if now is None else now
+        expired = [key for key, expires_at in self._revoked.items() if expires_at <= now]
+        for key in expired:
+            del self._revoked[key]
+
+    async def refresh(self, session_factories):
+        """Merge revoked, not yet expired rows of every shard's tokens table into the set."""
+        for session_factory in session_factories:
+            async with session_factory() as db:
+                rows = await db.execute(
+                    select(Token.token, Token.expires_at)
+                    .where(Token.is_revoked.is_(True), Token.expires_at > datetime.utcnow())
+                )
+                for token, expires_at in rows:
+                    self.add(token, expires_at.replace(tzinfo=timezone.utc).timestamp())
+        self.prune()
+
+    def request_refresh(self):
+        """Wakes `run` up before its interval elapses (e.g. on a revocation in another worker)."""
+        if self._refresh_requested is not None:
+            self._refresh_requested.set()
+
+    async def run(self, session_factories, interval: float):
+        self._refresh_requested = asyncio.Event()
+        while True:
+            self._refresh_requested.clear()
+            try:
+                await self.refresh(session_factories)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                if not asyncio.current_task().cancelling():
+                    logger.exception("Failed to refresh revoked tokens")
+            # A cancellation landing mid-query can be swallowed by the driver
+            # (or turned into a database error); don't wait through it.
+            if asyncio.current_task().cancelling():
+                raise asyncio.CancelledError
+            try:
+                await asyncio.wait_for(self._refresh_requested.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+revoked_tokens = RevocationSet()
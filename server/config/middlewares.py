@@ -0,0 +1,228 @@
+import json
+import logging
+import math
+import os
+import time
+
+from server.config.settings import PROFILE_SLOW_REQUESTS, PROFILE_DUMP_DIR, PROFILE_SAMPLE_SECONDS, \
+    SLOW_REQUEST_SECONDS, RATE_LIMIT_PATHS, LOGIN_RATE_PER_IP, LOGIN_BURST_PER_IP, LOGIN_RATE_GLOBAL, \
+    LOGIN_BURST_GLOBAL, RATE_LIMIT_MAX_CLIENTS, LOGIN_MAX_CONCURRENT, LOGIN_MAX_QUEUE, LOGIN_QUEUE_TIMEOUT_SECONDS, \
+    BATCH_LOGIN_PATH, BATCH_LOGIN_RATE_PER_IP, BATCH_LOGIN_BURST_PER_IP, BATCH_LOGIN_RATE_GLOBAL, BATCH_LOGIN_BURST_GLOBAL
+from server.utils.exception_handlers import error_response, internal_error_body, log_unhandled
+from server.utils.metrics import (
+    RequestStats, current_request_stats, db_seconds_per_request, db_statements_per_request,
+    http_request_seconds, http_requests_total, rate_limited_total,
+)
+from server.utils.profiler import SamplingProfiler
+from server.utils.rate_limit import AdmissionQueue, RateLimiter
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib decoder.
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+class UnhandledErrorMiddleware:
+    """
+    Turns exceptions no handler dealt with into the pre-encoded 500 body.
+
+    Starlette's own Exception handler re-raises after responding, so the
+    server would log a full traceback per failing request; here the error is
+    logged through the rate-limited logger instead.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        response_started = False
+
+        async def send_wrapper(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as exc:
+            if response_started:
+                raise
+            log_unhandled(scope["method"], scope["path"], exc)
+            app = scope.get("app")
+            body = internal_error_body(exc, debug=getattr(app, "debug", False))
+            await send({
+                "type": "http.response.start",
+                "status": 500,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+            })
+            await send({"type": "http.response.body", "body": body})
+
+
+class RateLimitMiddleware:
+    """
+    Throttles requests to `paths` (the login endpoint by default): a
+    per-client-IP and a global token bucket, then an admission queue capping
+    concurrent requests. Batch login has its own pair of buckets and is
+    charged one token per nickname, so its body is read (and replayed to the
+    app) here. Rejections are the pre-encoded 429 with Retry-After and are
+    decided before routing, so shed load never reaches the database.
+    """
+    def __init__(self, app, paths: tuple = RATE_LIMIT_PATHS, batch_path: str = BATCH_LOGIN_PATH):
+        self.app = app
+        self.paths = frozenset(paths)
+        self.batch_path = batch_path
+        self.limiter = RateLimiter(
+            LOGIN_RATE_PER_IP, LOGIN_BURST_PER_IP, LOGIN_RATE_GLOBAL, LOGIN_BURST_GLOBAL, RATE_LIMIT_MAX_CLIENTS
+        )
+        self.batch_limiter = RateLimiter(
+            BATCH_LOGIN_RATE_PER_IP, BATCH_LOGIN_BURST_PER_IP, BATCH_LOGIN_RATE_GLOBAL, BATCH_LOGIN_BURST_GLOBAL,
+            RATE_LIMIT_MAX_CLIENTS,
+        )
+        self.admission = AdmissionQueue(LOGIN_MAX_CONCURRENT, LOGIN_MAX_QUEUE, LOGIN_QUEUE_TIMEOUT_SECONDS)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if scope["path"] == self.batch_path:
+            body = await _read_body(receive)
+            limiter, cost = self.batch_limiter, _count_nicknames(body)
+            receive = _replay(body, receive)
+        elif scope["path"] in self.paths:
+            limiter, cost = self.limiter, 1
+        else:
+            await self.app(scope, receive, send)
+            return
+
+        client = scope.get("client")
+        rejected = limiter.check(client[0] if client else "unknown", cost)
+        if rejected is not None:
+            reason, retry_after = rejected
+            await self._reject(scope, receive, send, reason, retry_after)
+            return
+        if not await self.admission.acquire():
+            await self._reject(scope, receive, send, "queue", LOGIN_QUEUE_TIMEOUT_SECONDS)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.admission.release()
+
+    @staticmethod
+    async def _reject(scope, receive, send, reason: str, retry_after: float):
+        rate_limited_total.inc(reason=reason)
+        response = error_response(429, "Too Many Requests", {"Retry-After": str(max(1, math.ceil(retry_after)))})
+        await response(scope, receive, send)
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+def _replay(body: bytes, receive):
+    """`receive` that hands the already read body to the app, then waits for the disconnect as usual."""
+    sent = False
+
+    async def replay():
+        nonlocal sent
+        if sent:
+            return await receive()
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+    return replay
+
+
+def _count_nicknames(body: bytes) -> int:
+    """Tokens a batch login costs; a malformed body costs one and is rejected by validation."""
+    try:
+        nicknames = (orjson.loads(body) if orjson is not None else json.loads(body)).get("nicknames")
+    except (ValueError, AttributeError):
+        return 1
+    return max(1, len(nicknames)) if isinstance(nicknames, list) else 1
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording per-route latency, status counts and the
+    SQL statements/time spent by each request. Requests slower than
+    SLOW_REQUEST_SECONDS are logged and, with PROFILE_SLOW_REQUESTS enabled,
+    get a collapsed-stack profile dump in PROFILE_DUMP_DIR.
+    """
+    def __init__(self, app):
+        self.app = app
+        self.profiler = SamplingProfiler(PROFILE_SAMPLE_SECONDS) if PROFILE_SLOW_REQUESTS else None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if self.profiler is not None:
+            self.profiler.start()
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        stats_token = current_request_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            current_request_stats.reset(stats_token)
+            path = _route_label(scope)
+            http_request_seconds.observe(elapsed, method=scope["method"], route=path)
+            http_requests_total.inc(method=scope["method"], route=path, status=status_code)
+            db_statements_per_request.observe(stats.statements, route=path)
+            db_seconds_per_request.observe(stats.db_seconds, route=path)
+            if elapsed >= SLOW_REQUEST_SECONDS:
+                self._report_slow(scope["method"], path, elapsed, stats, started)
+
+    def _report_slow(self, method: str, path: str, elapsed: float, stats: RequestStats, started: float):
+        logger.warning(
+            "Slow request %s %s: %.1f ms, %d SQL statements (%.1f ms)",
+            method, path, elapsed * 1000, stats.statements, stats.db_seconds * 1000,
+        )
+        if self.profiler is None:
+            return
+        name = f"{int(time.time() * 1000)}-{method}-{path.strip('/').replace('/', '_') or 'root'}.folded"
+        dump_path = os.path.join(PROFILE_DUMP_DIR, name)
+        if self.profiler.dump(dump_path, started, started + elapsed):
+            logger.warning("Profile for slow request written to %s", dump_path)
+
+
+def _route_label(scope) -> str:
+    """
+    Low-cardinality route label: the request path with path parameter values
+    put back as `{name}` (the matched route object only knows its path
+    relative to the router it was included from).
+    """
+    if scope.get("route") is None:
+        return "unmatched"
+    path_params = scope.get("path_params")
+    if not path_params:
+        return scope["path"]
+    by_value = {str(value): name for name, value in path_params.items()}
+    return "/".join(
+        "{%s}" % by_value[segment] if segment in by_value else segment
+        for segment in scope["path"].split("/")
+    )
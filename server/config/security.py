@@ -1,22 +1,35 @@
+import secrets
 from datetime import datetime, timedelta, timezone
 
 import jwt
-from passlib.context import CryptContext
+
+from server.utils.metrics import jwt_seconds
 
 SECRET_KEY = "some_secret_key"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60*24
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+_pwd_context = None
+
+
+def get_password_context():
+    # passlib and its bcrypt backend are slow to import and unused by the
+    # nickname login flow, so they are loaded on first use.
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
 
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_password_context().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return get_password_context().hash(password)
 
 
 def generate_access_token(data: dict, expires_delta: timedelta | None = None):
@@ -25,7 +38,14 @@ def generate_access_token(data: dict, expires_delta: timedelta | None = None):
         expire = datetime.now(timezone.utc) + expires_delta
     else:
         expire = datetime.now(timezone.utc) + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    # jti keeps tokens issued within the same second distinct.
+    to_encode.update({"exp": expire, "jti": secrets.token_urlsafe(8)})
+    with jwt_seconds.time(op="encode"):
+        encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+
+def decode_access_token(token: str) -> dict:
+    """Verifies signature and expiry; raises jwt.InvalidTokenError otherwise."""
+    with jwt_seconds.time(op="decode"):
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], options={"require": ["exp"]})
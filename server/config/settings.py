@@ -1,25 +1,175 @@
+import os
+
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 
 from sqlalchemy import MetaData
 
+from server.config.storage import STORAGE_PROFILES, configure_sqlite
+from server.utils.metrics import instrument_engine
+
 HOST = '127.0.0.1'
 PORT = 65432
 
+# Game (TCP) server limits, per process / per connection.
+GAME_MAX_CONNECTIONS = 10000
+GAME_MAX_REQUEST_BYTES = 64 * 1024
+GAME_MAX_INFLIGHT = 32
+GAME_WRITE_BUFFER_HIGH = 256 * 1024
+GAME_IDLE_TIMEOUT_SECONDS = 300
+
 MIN_CREDITS = 10
 MAX_CREDITS = 100
 
-DB_FILE = 'game.db'
-DATABASE_URL = f'sqlite:///{DB_FILE}'
+REVOCATION_REFRESH_SECONDS = 5
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    echo=False
-)
+# Expired tokens are deleted TOKEN_SWEEP_BATCH rows per transaction.
+TOKEN_SWEEP_SECONDS = 60
+TOKEN_SWEEP_BATCH = 500
+TOKEN_SWEEP_PAUSE_SECONDS = 0.05
+
+# Hot-account LRU (balance and owned items) in front of account lookups.
+ACCOUNT_CACHE_TTL_SECONDS = 30
+ACCOUNT_CACHE_MAX_ENTRIES = 100000
+# account_changes rows read per query by each process, and how many of the
+# newest rows are kept (the API and the game server prune every
+# ACCOUNT_CHANGES_PRUNE_SECONDS).
+ACCOUNT_CHANGES_BATCH = 5000
+ACCOUNT_CHANGES_RETAIN = 100000
+ACCOUNT_CHANGES_PRUNE_SECONDS = 60
+
+# Login throttling: token buckets per client IP and for the whole process,
+# then a bounded admission queue; anything over the limits gets a 429 before
+# touching the database. Applies to the paths in RATE_LIMIT_PATHS; batch
+# login has its own buckets, charged one token per nickname in the request.
+RATE_LIMIT_ENABLED = os.getenv('GAME_RATE_LIMIT', '1') == '1'
+RATE_LIMIT_PATHS = ('/api/v1/auth/login',)
+BATCH_LOGIN_PATH = '/api/v1/auth/login/batch'
+BATCH_LOGIN_RATE_PER_IP = 1000.0
+BATCH_LOGIN_BURST_PER_IP = 10000
+BATCH_LOGIN_RATE_GLOBAL = 5000.0
+BATCH_LOGIN_BURST_GLOBAL = 20000
+LOGIN_RATE_PER_IP = 5.0
+LOGIN_BURST_PER_IP = 20
+LOGIN_RATE_GLOBAL = 500.0
+LOGIN_BURST_GLOBAL = 1000
+RATE_LIMIT_MAX_CLIENTS = 100000
+LOGIN_MAX_CONCURRENT = 64
+LOGIN_MAX_QUEUE = 256
+LOGIN_QUEUE_TIMEOUT_SECONDS = 1.0
+
+# In-memory leaderboard: full rebuild interval (a backstop; changes made by
+# other processes arrive through account_changes) and the largest top-N a
+# request may ask for.
+LEADERBOARD_REBUILD_SECONDS = 300
+LEADERBOARD_MAX_LIMIT = 100
+
+# Audit event log (server.db.eventlog): segment directory, group-commit
+# fsync interval and records per segment file.
+EVENT_LOG_ENABLED = os.getenv('GAME_EVENT_LOG', '1') == '1'
+EVENT_LOG_DIR = os.getenv('GAME_EVENT_LOG_DIR', 'events')
+EVENT_LOG_COMMIT_SECONDS = 0.05
+EVENT_LOG_SEGMENT_RECORDS = 1 << 20
+
+# Worker processes for server.launcher, and how often each worker checks the
+# database for cache invalidations published by the others.
+WORKERS = int(os.getenv('GAME_WORKERS', '1'))
+INVALIDATION_POLL_SECONDS = 0.25
+
+# Max nicknames per batch login request (at most the per-IP burst, so every
+# valid batch can be admitted), and bound parameters per IN (...) query.
+BATCH_LOGIN_MAX_NICKNAMES = BATCH_LOGIN_BURST_PER_IP
+SQL_IN_CHUNK_SIZE = 500
+
+# Credit ledger: max seconds of buffered credit changes, and dirty accounts
+# that trigger an early flush. A balance read that overlaps a flush is
+# retried after LEDGER_SETTLE_SECONDS.
+LEDGER_FLUSH_SECONDS = 1.0
+LEDGER_MAX_PENDING = 1000
+LEDGER_SETTLE_SECONDS = 0.002
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Requests slower than this are logged; with profiling enabled the event loop
+# is sampled and a collapsed-stack profile is dumped per slow request.
+SLOW_REQUEST_SECONDS = float(os.getenv('GAME_SLOW_REQUEST_SECONDS', '0.5'))
+PROFILE_SLOW_REQUESTS = os.getenv('GAME_PROFILE_SLOW_REQUESTS', '0') == '1'
+PROFILE_SAMPLE_SECONDS = 0.005
+PROFILE_DUMP_DIR = os.getenv('GAME_PROFILE_DUMP_DIR', 'profiles')
+
+DB_FILE = os.getenv('GAME_DB_FILE', 'game.db')
+
+# See server.config.storage.STORAGE_PROFILES.
+STORAGE_PROFILE = os.getenv('GAME_STORAGE_PROFILE', 'wal')
+# Read connections per engine; size it to the number of threads/tasks that
+# query concurrently. The game server runs its handlers on an executor with
+# this many threads, so a handler never waits for a read connection.
+DB_READ_POOL_SIZE = int(os.getenv('GAME_DB_READ_POOL_SIZE', '8'))
+DB_POOL_TIMEOUT_SECONDS = 30
+
+# Accounts, tokens and inventories are hash-partitioned by nickname over
+# SHARD_COUNT database files (see server.config.sharding); shard 0 is DB_FILE
+# and also holds the authoritative item catalog.
+SHARD_COUNT = int(os.getenv('GAME_SHARD_COUNT', '1'))
+
+
+def create_engines(db_file: str):
+    """Write and read engines (sync and async) for one SQLite file."""
+    database_url = f'sqlite:///{db_file}'
+    async_database_url = f'sqlite+aiosqlite:///{db_file}'
+    # SQLite allows a single writer, so the write engines keep one connection and
+    # queue writers in the pool instead of on the database lock.
+    write = create_engine(
+        database_url,
+        connect_args={"check_same_thread": False},
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=DB_POOL_TIMEOUT_SECONDS,
+        echo=False
+    )
+    read = create_engine(
+        database_url,
+        connect_args={"check_same_thread": False},
+        pool_size=DB_READ_POOL_SIZE,
+        max_overflow=0,
+        pool_timeout=DB_POOL_TIMEOUT_SECONDS,
+        echo=False
+    )
+    async_write = create_async_engine(
+        async_database_url,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=DB_POOL_TIMEOUT_SECONDS,
+        echo=False
+    )
+    async_read = create_async_engine(
+        async_database_url,
+        pool_size=DB_READ_POOL_SIZE,
+        max_overflow=0,
+        pool_timeout=DB_POOL_TIMEOUT_SECONDS,
+        echo=False
+    )
+    for _engine, _writer in ((write, True), (read, False), (async_write, True), (async_read, False)):
+        configure_sqlite(_engine, STORAGE_PROFILES[STORAGE_PROFILE], writer=_writer)
+        instrument_engine(_engine)
+    return write, read, async_write, async_read
+
+
+def create_session_factories(write, read, async_write, async_read):
+    # expire_on_commit=False: attributes stay readable after commit without an extra
+    # (implicit, and under asyncio forbidden) lazy refresh round trip.
+    return (
+        sessionmaker(autocommit=False, autoflush=False, bind=write),
+        sessionmaker(autocommit=False, autoflush=False, bind=read),
+        async_sessionmaker(bind=async_write, class_=AsyncSession, autoflush=False, expire_on_commit=False),
+        async_sessionmaker(bind=async_read, class_=AsyncSession, autoflush=False, expire_on_commit=False),
+    )
+
+
+engine, read_engine, async_engine, async_read_engine = create_engines(DB_FILE)
+SessionLocal, ReadSessionLocal, AsyncSessionLocal, AsyncReadSessionLocal = create_session_factories(
+    engine, read_engine, async_engine, async_read_engine
+)
 
 Base = declarative_base()
 
@@ -0,0 +1,121 @@
+"""
+Hash partitioning of account data over several SQLite files.
+
+Account, Token and AccountItem rows live on the shard picked by a stable
+hash (CRC32) of the account nickname, so each shard has its own writer lock
+and write throughput grows with SHARD_COUNT. The item catalog (items_master)
+exists only on shard 0, which is DB_FILE itself; readers resolve owned item
+keys through the catalog snapshot rather than a join. With
+the default SHARD_COUNT=1 shard 0 is the only shard and reuses the engines
+defined in server.config.settings.
+
+Changing SHARD_COUNT requires moving accounts with server.db.rebalance.
+"""
+import os
+import zlib
+from typing import Iterable
+
+from server.config.settings import (
+    AsyncReadSessionLocal, AsyncSessionLocal, DB_FILE, ReadSessionLocal, SHARD_COUNT, SessionLocal,
+    async_engine, async_read_engine, create_engines, create_session_factories, engine, read_engine,
+)
+
+
+class Shard:
+    __slots__ = (
+        "index", "db_file", "engine", "read_engine", "async_engine", "async_read_engine",
+        "SessionLocal", "ReadSessionLocal", "AsyncSessionLocal", "AsyncReadSessionLocal",
+    )
+
+    def __init__(self, index: int, db_file: str, engines: tuple, session_factories: tuple):
+        self.index = index
+        self.db_file = db_file
+        self.engine, self.read_engine, self.async_engine, self.async_read_engine = engines
+        (self.SessionLocal, self.ReadSessionLocal,
+         self.AsyncSessionLocal, self.AsyncReadSessionLocal) = session_factories
+
+    def __repr__(self):
+        return f"Shard({self.index}, {self.db_file!r})"
+
+    @property
+    def sync_engines(self) -> tuple:
+        return self.engine, self.read_engine
+
+    @property
+    def async_engines(self) -> tuple:
+        return self.async_engine, self.async_read_engine
+
+    async def dispose(self):
+        await self.async_engine.dispose()
+        await self.async_read_engine.dispose()
+
+
+def shard_file(index: int, db_file: str = DB_FILE) -> str:
+    if index == 0:
+        return db_file
+    root, ext = os.path.splitext(db_file)
+    return f"{root}.shard{index}{ext or '.db'}"
+
+
+def shard_index(nickname: str, count: int) -> int:
+    # CRC32 rather than hash(): it must agree across processes and restarts.
+    return zlib.crc32(nickname.encode("utf-8")) % count
+
+
+_shards: dict[int, Shard] = {
+    0: Shard(
+        0, DB_FILE,
+        (engine, read_engine, async_engine, async_read_engine),
+        (SessionLocal, ReadSessionLocal, AsyncSessionLocal, AsyncReadSessionLocal),
+    ),
+}
+
+
+def get_shard(index: int) -> Shard:
+    """Shard objects (and their engines) are created once per process."""
+    shard = _shards.get(index)
+    if shard is None:
+        db_file = shard_file(index)
+        engines = create_engines(db_file)
+        shard = _shards[index] = Shard(index, db_file, engines, create_session_factories(*engines))
+    return shard
+
+
+class ShardRouter:
+    def __init__(self, count: int):
+        if count < 1:
+            raise ValueError("Shard count must be at least 1")
+        self.shards = [get_shard(index) for index in range(count)]
+
+    def __len__(self) -> int:
+        return len(self.shards)
+
+    def __iter__(self):
+        return iter(self.shards)
+
+    def __getitem__(self, index: int) -> Shard:
+        return self.shards[index]
+
+    @property
+    def catalog(self) -> Shard:
+        return self.shards[0]
+
+    def for_nickname(self, nickname: str) -> Shard:
+        if len(self.shards) == 1:
+            return self.shards[0]
+        return self.shards[shard_index(nickname, len(self.shards))]
+
+    def group(self, nicknames: Iterable[str]) -> dict[Shard, list[str]]:
+        groups: dict[Shard, list[str]] = {}
+        for nickname in nicknames:
+            groups.setdefault(self.for_nickname(nickname), []).append(nickname)
+        return groups
+
+
+shards = ShardRouter(SHARD_COUNT)
+
+
+async def get_async_shard_db(nickname: str):
+    """Write session on the shard owning the `nickname` request parameter."""
+    async with shards.for_nickname(nickname).AsyncSessionLocal() as db:
+        yield db
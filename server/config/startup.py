@@ -0,0 +1,69 @@
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from sqlalchemy import text
+
+from server.config.security import decode_access_token, generate_access_token
+from server.utils.metrics import startup_seconds
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    """Times named startup phases; `report` logs the breakdown and publishes it as a gauge."""
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: list[tuple[str, float]] = []
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - started))
+
+    def report(self) -> float:
+        total = time.perf_counter() - self.started
+        for name, seconds in self.phases:
+            startup_seconds.set(seconds, phase=name)
+        startup_seconds.set(total, phase="total")
+        logger.info(
+            "Startup finished in %.1f ms (%s)",
+            total * 1000, ", ".join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in self.phases),
+        )
+        return total
+
+
+def warm_jwt():
+    """First encode/decode pays for PyJWT's algorithm and key setup."""
+    decode_access_token(generate_access_token({"user": "warmup"}, timedelta(minutes=1)))
+
+
+def _open_sync(engine, connections: int):
+    opened = [engine.connect() for _ in range(connections)]
+    for connection in opened:
+        connection.execute(text("SELECT 1"))
+        connection.close()
+
+
+async def _open_async(engine, connections: int):
+    async def open_one():
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+    await asyncio.gather(*(open_one() for _ in range(connections)))
+
+
+async def warm_connections(sync_engines, async_engines):
+    """
+    Fills every pool up front so the first requests do not pay for opening
+    SQLite connections and running their pragmas.
+    """
+    await asyncio.gather(
+        *(asyncio.to_thread(_open_sync, engine, engine.pool.size()) for engine in sync_engines),
+        *(_open_async(engine, engine.pool.size()) for engine in async_engines),
+    )
@@ -0,0 +1,53 @@
+from sqlalchemy import event
+
+# PRAGMAs applied to every new SQLite connection, per storage profile.
+STORAGE_PROFILES = {
+    # SQLite defaults: rollback journal, synchronous=FULL, readers blocked by writers.
+    "default": {},
+    # WAL lets readers run alongside the single writer; synchronous=NORMAL only
+    # fsyncs at checkpoints (durable against process crashes, may lose the last
+    # transactions on power loss).
+    "wal": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64000,
+        "mmap_size": 256 * 1024 * 1024,
+        "busy_timeout": 5000,
+        "temp_store": "MEMORY",
+    },
+    # As "wal", but every commit is fsynced.
+    "wal-durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -64000,
+        "mmap_size": 256 * 1024 * 1024,
+        "busy_timeout": 5000,
+        "temp_store": "MEMORY",
+    },
+}
+
+
+def configure_sqlite(engine, pragmas: dict, *, writer: bool):
+    """
+    Applies `pragmas` on connect. Writer engines start every transaction with
+    BEGIN IMMEDIATE, so the write lock is taken up front instead of failing
+    with SQLITE_BUSY on a read-to-write upgrade; reader engines are query_only.
+    """
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        # Take transaction control away from the driver; see the "begin" hook.
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+            if not writer:
+                cursor.execute("PRAGMA query_only=ON")
+        finally:
+            cursor.close()
+
+    @event.listens_for(sync_engine, "begin")
+    def _on_begin(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE" if writer else "BEGIN")
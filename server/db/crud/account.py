@@ -1,50 +1,134 @@
+import asyncio
 from datetime import datetime
-
-from sqlalchemy.orm import Session
-
-from server.db.models.all import Account, Token
-
-
-def get_user_by_nickname(db: Session, nickname: str):
-    return db.query(Account).filter(Account.nickname == nickname).first()
-
-
-def create_user_with_nickname(db: Session, nickname: str, bonus: int):
-    user = Account(nickname=nickname, credits=bonus)
-    db.add(user)
-    db.commit()
-    db.refresh(user)
+from typing import NamedTuple, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from server.cache.accounts import AccountRecord, account_cache
+from server.cache.invalidation import REVOCATIONS, publish_account_changes_async, publish_statement
+from server.cache.leaderboard import leaderboard
+from server.config.settings import LEDGER_SETTLE_SECONDS, SQL_IN_CHUNK_SIZE
+from server.db.eventlog import ACCOUNT_CREATED, event_log
+from server.db.ledger import credit_ledger
+from server.db.models.all import Account, AccountItem, Token
+
+
+async def get_user_by_nickname(db: AsyncSession, nickname: str) -> Optional[AccountRecord]:
+    user = account_cache.get(nickname)
+    while user is None:
+        with account_cache.filling(nickname) as fill:
+            epoch = credit_ledger.epoch
+            rows = await get_inventory_rows(db, nickname)
+            if not rows:
+                return None
+            credits = credit_ledger.settled_balance(nickname, rows[0].credits, epoch)
+            if credits is None:
+                # A ledger flush overlapped the read; read again from a new snapshot.
+                await db.rollback()
+                await asyncio.sleep(LEDGER_SETTLE_SECONDS)
+                continue
+            user = fill.put(credits, [row.item_key for row in rows if row.item_key is not None])
     return user
 
 
-def update_user_credit(db: Session, user: Account, credit: int):
-    user.credits += credit
-    db.commit()
-    db.refresh(user)
-    return user
+def select_inventory(nickname: str):
+    """
+    Balance plus owned item keys in one query (one row per item, a NULL key
+    if none). Only shard 0 has the item catalog, so names and prices come
+    from the catalog snapshot, not a join.
+    """
+    return (
+        select(Account.credits, AccountItem.item_key)
+        .outerjoin(AccountItem, AccountItem.nickname == Account.nickname)
+        .where(Account.nickname == nickname)
+    )
 
 
-def get_token_by_key(db: Session, key: str):
-    return db.query(Token).filter(Token.token == key).first()
+async def get_inventory_rows(db: AsyncSession, nickname: str):
+    return (await db.execute(select_inventory(nickname))).all()
 
 
-def get_token_by_account(db: Session, nickname: str):
-    return db.query(Token).filter(Token.account_nickname == nickname).first()
+class LoginResult(NamedTuple):
+    token: str
+    # Starting credits if the account was created by this login, otherwise None.
+    created_credits: Optional[int]
 
 
-def create_access_token(db: Session, token: str, expires_at):
+async def login_user(db: AsyncSession, nickname: str, bonus: int, key: str, expires_at) -> LoginResult:
+    """
+    Login unit of work: get-or-create the account and insert its token in a
+    single transaction (one commit, no refresh).
+    """
     expires_at = datetime.utcnow() + expires_at
-    token = Token(token=token, expires_at=expires_at)
-    db.add(token)
-    db.commit()
-    db.refresh(token)
-    return token
-
 
-def update_token(db: Session, token: Token, key: str, expires_at):
-    token.expires_at = datetime.utcnow() + expires_at
-
-    token.token = key
-    db.commit()
-    db.refresh(token)
-    return token
\ No newline at end of file
+    created_credits = await db.scalar(
+        insert(Account)
+        .values(nickname=nickname, credits=bonus)
+        .on_conflict_do_nothing(index_elements=[Account.nickname])
+        .returning(Account.credits)
+    )
+    if created_credits is not None:
+        await publish_account_changes_async(db, [nickname])
+    # One row per issued token: earlier tokens stay valid until they expire, so
+    # their rows must stay revocable. The sweeper deletes them once expired.
+    await db.execute(
+        insert(Token).values(token=key, account_nickname=nickname, expires_at=expires_at, is_revoked=False)
+    )
+    await db.commit()
+    if created_credits is not None:
+        account_cache.put(nickname, created_credits, ())
+        leaderboard.set(nickname, created_credits)
+        event_log.append(ACCOUNT_CREATED, nickname, created_credits)
+    return LoginResult(token=key, created_credits=created_credits)
+
+
+_accounts = Account.__table__
+_tokens = Token.__table__
+
+
+async def login_users(db: AsyncSession, logins: dict[str, tuple[int, str]], expires_at) -> dict[str, Optional[int]]:
+    """
+    Batch form of login_user for `{nickname: (bonus, token)}`: one IN query per
+    chunk to find existing accounts, executemany inserts, one commit.
+    Returns `{nickname: created credits or None}`.
+    """
+    expires_at = datetime.utcnow() + expires_at
+    nicknames = list(logins)
+
+    existing = set()
+    for start in range(0, len(nicknames), SQL_IN_CHUNK_SIZE):
+        chunk = nicknames[start:start + SQL_IN_CHUNK_SIZE]
+        existing.update(await db.scalars(select(_accounts.c.nickname).where(_accounts.c.nickname.in_(chunk))))
+
+    created = {nickname: logins[nickname][0] for nickname in nicknames if nickname not in existing}
+    if created:
+        await db.execute(
+            insert(_accounts).on_conflict_do_nothing(index_elements=["nickname"]),
+            [{"nickname": nickname, "credits": credits} for nickname, credits in created.items()],
+        )
+        await publish_account_changes_async(db, created)
+    await db.execute(insert(_tokens), [
+        {"token": logins[nickname][1], "account_nickname": nickname, "expires_at": expires_at, "is_revoked": False}
+        for nickname in nicknames
+    ])
+    await db.commit()
+    for nickname, credits in created.items():
+        account_cache.put(nickname, credits, ())
+        leaderboard.set(nickname, credits)
+        event_log.append(ACCOUNT_CREATED, nickname, credits)
+    return {nickname: created.get(nickname) for nickname in nicknames}
+
+
+async def revoke_token(db: AsyncSession, key: str):
+    token = await db.scalar(
+        update(Token)
+        .where(Token.token == key, Token.is_revoked.is_(False))
+        .values(is_revoked=True)
+        .returning(Token.expires_at)
+    )
+    if token is not None:
+        await db.execute(publish_statement(REVOCATIONS))
+    await db.commit()
+    return token
@@ -0,0 +1,143 @@
+import logging
+import threading
+from typing import Optional
+
+from sqlalchemy import bindparam, update
+
+from server.cache.accounts import account_cache
+from server.cache.invalidation import publish_account_changes
+from server.cache.leaderboard import leaderboard
+from server.config.settings import LEDGER_FLUSH_SECONDS, LEDGER_MAX_PENDING
+from server.config.sharding import shards
+from server.db.eventlog import BONUS, event_log
+from server.db.models.all import Account
+
+logger = logging.getLogger(__name__)
+
+_increment_credits = (
+    update(Account.__table__)
+    .where(Account.__table__.c.nickname == bindparam("b_nickname"))
+    .values(credits=Account.__table__.c.credits + bindparam("b_delta"))
+)
+
+
+class CreditLedger:
+    """
+    Write-behind buffer for credit changes.
+
+    Deltas are coalesced per nickname in memory and applied every
+    `flush_interval` seconds (or as soon as `max_pending` accounts are dirty)
+    as one transaction of atomic `credits = credits + ?` increments per
+    database (`bind_for(nickname)` picks the shard's write engine).
+    At most `flush_interval` seconds of changes are lost on a crash;
+    `close()` flushes synchronously on shutdown.
+
+    A flush takes the pending deltas before its UPDATE commits, so a stored
+    balance read while it is in flight may or may not include them; readers
+    that add `pending()` to a stored balance check `settled_balance`.
+    """
+    def __init__(self, bind_for, flush_interval: float, max_pending: int):
+        self.bind_for = bind_for
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: dict[str, int] = {}
+        # Bumped when a flush takes the pending deltas and again once they are
+        # written (or put back): odd while a flush is in flight.
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def add(self, nickname: str, delta: int):
+        with account_cache.changing(nickname):
+            with self._lock:
+                self._pending[nickname] = self._pending.get(nickname, 0) + delta
+                full = len(self._pending) >= self.max_pending
+            account_cache.add_credits(nickname, delta)
+        if full:
+            self._wakeup.set()
+        leaderboard.add(nickname, delta)
+        event_log.append(BONUS, nickname, delta)
+
+    def pending(self, nickname: str) -> int:
+        """Credits accepted for `nickname` but not yet written to the database."""
+        return self._pending.get(nickname, 0)
+
+    @property
+    def epoch(self) -> int:
+        return self._epoch
+
+    def settled_balance(self, nickname: str, stored: int, epoch: int) -> Optional[int]:
+        """
+        `stored` credits, read after taking `epoch`, plus the pending ones; None
+        if a flush overlapped the read, which then counts the flushed delta
+        twice or not at all (read again in a new transaction).
+        """
+        total = stored + self.pending(nickname)
+        if epoch & 1 or epoch != self._epoch:
+            return None
+        return total
+
+    def flush(self) -> int:
+        with self._lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, {}
+            self._epoch += 1
+        try:
+            return self._write(batch)
+        finally:
+            with self._lock:
+                self._epoch += 1
+
+    def _write(self, batch: dict[str, int]) -> int:
+        by_bind: dict = {}
+        for nickname, delta in batch.items():
+            if delta:
+                by_bind.setdefault(self.bind_for(nickname), []).append({"b_nickname": nickname, "b_delta": delta})
+
+        flushed, failed = 0, None
+        for bind, rows in by_bind.items():
+            try:
+                with bind.begin() as conn:
+                    conn.execute(_increment_credits, rows)
+                    publish_account_changes(conn, [row["b_nickname"] for row in rows])
+                flushed += len(rows)
+            except Exception as exc:
+                # Put this database's rows back so they are retried by the next flush.
+                with self._lock:
+                    for row in rows:
+                        self._pending[row["b_nickname"]] = self._pending.get(row["b_nickname"], 0) + row["b_delta"]
+                failed = exc
+        if failed is not None:
+            raise failed
+        return flushed
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="credit-ledger", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Credit ledger flush failed")
+
+
+credit_ledger = CreditLedger(lambda nickname: shards.for_nickname(nickname).engine,
+                             LEDGER_FLUSH_SECONDS, LEDGER_MAX_PENDING)
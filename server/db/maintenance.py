@@ -0,0 +1,120 @@
+import asyncio
+import logging
+from datetime import datetime
+
+from sqlalchemy import delete, func, select
+
+from server.db.models.all import AccountChange, Token
+from server.utils.metrics import tokens_rows, tokens_swept_total
+
+logger = logging.getLogger(__name__)
+
+
+async def _uninterrupted(write):
+    """
+    Runs a write transaction to the end even if the caller is cancelled.
+    aiosqlite drops a connection cancelled mid-query without closing it, which
+    would keep the database write lock until the connection is collected.
+    """
+    task = asyncio.ensure_future(write)
+    try:
+        return await asyncio.shield(task)
+    except asyncio.CancelledError:
+        await asyncio.wait([task])
+        raise
+
+
+class TokenSweeper:
+    """
+    Deletes expired token rows in small batches, one short write transaction
+    per batch with a pause in between, so logins never queue behind a long
+    delete. Revoked tokens are only removed once expired, by which time their
+    revocation no longer matters. The table size is published as a gauge
+    after every sweep.
+    """
+    def __init__(self, session_factory, batch_size: int, pause: float):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.pause = pause
+
+    async def sweep(self) -> int:
+        swept = 0
+        while True:
+            deleted = await _uninterrupted(self._sweep_batch(datetime.utcnow()))
+            swept += deleted
+            tokens_swept_total.inc(deleted)
+            if deleted < self.batch_size:
+                break
+            await asyncio.sleep(self.pause)
+
+        async with self.session_factory() as db:
+            tokens_rows.set(await db.scalar(select(func.count()).select_from(Token)))
+        return swept
+
+    async def _sweep_batch(self, now: datetime) -> int:
+        async with self.session_factory() as db:
+            expired = (
+                select(Token.id)
+                .where(Token.expires_at < now)
+                .order_by(Token.expires_at)
+                .limit(self.batch_size)
+                .scalar_subquery()
+            )
+            result = await db.execute(delete(Token).where(Token.id.in_(expired)))
+            await db.commit()
+        return result.rowcount
+
+    async def run(self, interval: float):
+        while True:
+            try:
+                swept = await self.sweep()
+                if swept:
+                    logger.info("Swept %d expired tokens", swept)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                if not asyncio.current_task().cancelling():
+                    logger.exception("Failed to sweep expired tokens")
+            # A cancellation landing mid-query can be swallowed by the driver
+            # (or turned into a database error); don't sleep through it.
+            if asyncio.current_task().cancelling():
+                raise asyncio.CancelledError
+            await asyncio.sleep(interval)
+
+
+class AccountChangePruner:
+    """
+    Keeps the newest `retain` rows of account_changes. Followers read it
+    within a poll interval, so only a follower stalled for that many changes
+    misses evictions (and falls back to its cache TTL).
+    """
+    def __init__(self, session_factory, retain: int):
+        self.session_factory = session_factory
+        self.retain = retain
+
+    async def prune(self) -> int:
+        return await _uninterrupted(self._prune())
+
+    async def _prune(self) -> int:
+        async with self.session_factory() as db:
+            newest = await db.scalar(select(func.max(AccountChange.id)))
+            if newest is None or newest <= self.retain:
+                return 0
+            result = await db.execute(delete(AccountChange).where(AccountChange.id <= newest - self.retain))
+            await db.commit()
+        return result.rowcount
+
+    async def run(self, interval: float):
+        while True:
+            try:
+                pruned = await self.prune()
+                if pruned:
+                    logger.debug("Pruned %d account change rows", pruned)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                if not asyncio.current_task().cancelling():
+                    logger.exception("Failed to prune account changes")
+            if asyncio.current_task().cancelling():
+                raise asyncio.CancelledError
+            await asyncio.sleep(interval)
@@ -1,11 +1,18 @@
 import random
+import time
 from typing import Optional
 
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
 
-from server.config.settings import MIN_CREDITS, MAX_CREDITS
-from server.db.models.all import Account, ItemMaster, AccountItem, Token
+from server.cache.accounts import AccountRecord, account_cache
+from server.cache.invalidation import publish_account_changes
+from server.cache.leaderboard import leaderboard
+from server.config.settings import LEDGER_SETTLE_SECONDS, MIN_CREDITS, MAX_CREDITS
+from server.db.crud.account import select_inventory
+from server.db.eventlog import ACCOUNT_CREATED, event_log
+from server.db.ledger import credit_ledger
+from server.db.models.all import Account, AccountItem, Token
 
 
 class AccountManager:
@@ -15,33 +22,51 @@ class AccountManager:
     def __init__(self, db: Session):
         self.db = db
 
-    def get_account_by_nickname(self, nickname: str) -> Optional[Account]:
-        return self.db.query(Account).filter(Account.nickname == nickname).first()
+    def get_account_by_nickname(self, nickname: str) -> Optional[AccountRecord]:
+        record = account_cache.get(nickname)
+        while record is None:
+            with account_cache.filling(nickname) as fill:
+                epoch = credit_ledger.epoch
+                # Owned items come back in the same query; login replies list them.
+                rows = self.get_inventory(nickname)
+                if not rows:
+                    return None
+                credits = credit_ledger.settled_balance(nickname, rows[0].credits, epoch)
+                if credits is None:
+                    # A ledger flush overlapped the read; read again from a new snapshot.
+                    self.db.rollback()
+                    time.sleep(LEDGER_SETTLE_SECONDS)
+                    continue
+                record = fill.put(credits, [row.item_key for row in rows if row.item_key is not None])
+        return record
 
-    def create_account(self, nickname: str) -> Account:
+    def get_inventory(self, nickname: str) -> list:
+        return self.db.execute(select_inventory(nickname)).all()
+
+    def create_account(self, nickname: str) -> AccountRecord:
         bonus = random.randint(MIN_CREDITS, MAX_CREDITS)
         db_account = Account(nickname=nickname, credits=bonus)
         self.db.add(db_account)
         try:
+            publish_account_changes(self.db, [nickname])
             self.db.commit()
-            self.db.refresh(db_account)
-            return db_account
         except Exception as e:
             self.db.rollback()
             raise HTTPException(status_code=400, detail="Nickname already exists")
+        leaderboard.set(nickname, bonus)
+        event_log.append(ACCOUNT_CREATED, nickname, bonus)
+        return account_cache.put(nickname, bonus, ())
 
-    def update_account_on_login(self, nickname):
+    def update_account_on_login(self, nickname) -> Optional[AccountRecord]:
         account = self.get_account_by_nickname(nickname)
         if account:
             bonus = random.randint(MIN_CREDITS, MAX_CREDITS)
-            account.credits += bonus
-            try:
-                self.db.commit()
-                self.db.refresh(account)
-                return account
-            except Exception as e:
-                self.db.rollback()
-                raise HTTPException(status_code=400, detail="Problem occurred while updating account!")
+            # The ledger writes the bonus through to the cached record.
+            credit_ledger.add(nickname, bonus)
+            if account_cache.peek(nickname) is not account:
+                # Evicted in the meantime; patch the copy in hand.
+                account.credits += bonus
+            return account
         return None
 
 
@@ -1,4 +1,4 @@
-from server.db.models.all import ItemMaster
+from server.cache.catalog import catalog
 
 
 class ItemManager:
@@ -9,9 +9,4 @@ class ItemManager:
         self.SessionLocal = session_factory
 
     def get_items_master(self):
-        session = self.SessionLocal()
-        try:
-            items = session.query(ItemMaster).all()
-            return {item.item_key: {"name": item.name, "price": item.price} for item in items}
-        finally:
-            session.close()
+        return catalog.get(self.SessionLocal).items
@@ -0,0 +1,113 @@
+from typing import NamedTuple
+
+from fastapi import HTTPException
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from server.cache.accounts import account_cache
+from server.cache.catalog import catalog
+from server.cache.invalidation import publish_account_changes
+from server.cache.leaderboard import leaderboard
+from server.db.eventlog import BUY, SELL, event_log
+from server.db.ledger import credit_ledger
+from server.db.models.all import Account, AccountItem
+
+
+class TradeResult(NamedTuple):
+    nickname: str
+    item_key: str
+    price: int
+    # Balance after the trade, including credits still buffered in the ledger.
+    credits: int
+
+
+class TradeManager:
+    """
+    Buys and sells items with conditional statements in one write transaction.
+
+    Ownership is decided by the account_items primary key (insert-if-absent /
+    delete-if-present) and the balance by a guarded decrement, so concurrent
+    trades can neither double-spend nor double-sell, and nothing is re-read.
+    The write engine begins with BEGIN IMMEDIATE, so trades queue on the
+    write lock instead of retrying on SQLITE_BUSY.
+    """
+    def __init__(self, db: Session, session_factory=None):
+        self.db = db
+        self.catalog_session_factory = session_factory
+
+    def buy(self, nickname: str, item_key: str) -> TradeResult:
+        price = self._price(item_key)
+        with account_cache.changing(nickname):
+            try:
+                inserted = self.db.scalar(
+                    insert(AccountItem)
+                    .values(nickname=nickname, item_key=item_key)
+                    .on_conflict_do_nothing()
+                    .returning(AccountItem.item_key)
+                )
+                if inserted is None:
+                    raise HTTPException(status_code=400, detail="Item already owned")
+
+                # Read under the write lock: a concurrent ledger flush can then only
+                # make this undercount, never count a delta twice.
+                pending = credit_ledger.pending(nickname)
+                credits = self.db.scalar(
+                    update(Account)
+                    .where(Account.nickname == nickname, Account.credits + pending >= price)
+                    .values(credits=Account.credits - price)
+                    .returning(Account.credits)
+                )
+                if credits is None:
+                    raise HTTPException(status_code=400, detail=self._missing_or("Not enough credits", nickname))
+                publish_account_changes(self.db, [nickname])
+                self.db.commit()
+            except Exception:
+                self.db.rollback()
+                raise
+            account_cache.apply_trade(nickname, -price, item_key, owned=True)
+        leaderboard.set(nickname, credits + pending)
+        event_log.append(BUY, nickname, -price, item_key)
+        return TradeResult(nickname, item_key, price, credits + pending)
+
+    def sell(self, nickname: str, item_key: str) -> TradeResult:
+        price = self._price(item_key)
+        with account_cache.changing(nickname):
+            try:
+                deleted = self.db.scalar(
+                    delete(AccountItem)
+                    .where(AccountItem.nickname == nickname, AccountItem.item_key == item_key)
+                    .returning(AccountItem.item_key)
+                )
+                if deleted is None:
+                    raise HTTPException(status_code=400, detail="Item not owned")
+
+                pending = credit_ledger.pending(nickname)
+                credits = self.db.scalar(
+                    update(Account)
+                    .where(Account.nickname == nickname)
+                    .values(credits=Account.credits + price)
+                    .returning(Account.credits)
+                )
+                if credits is None:
+                    raise HTTPException(status_code=404, detail="Account not found")
+                publish_account_changes(self.db, [nickname])
+                self.db.commit()
+            except Exception:
+                self.db.rollback()
+                raise
+            account_cache.apply_trade(nickname, price, item_key, owned=False)
+        leaderboard.set(nickname, credits + pending)
+        event_log.append(SELL, nickname, price, item_key)
+        return TradeResult(nickname, item_key, price, credits + pending)
+
+    def _price(self, item_key: str) -> int:
+        item = catalog.get(self.catalog_session_factory).items.get(item_key)
+        if item is None:
+            raise HTTPException(status_code=404, detail="Item not found")
+        return item["price"]
+
+    def _missing_or(self, detail: str, nickname: str) -> str:
+        # Failure path only: tell a missing account apart from a low balance.
+        exists = self.db.scalar(select(Account.nickname).where(Account.nickname == nickname))
+        return detail if exists else "Account not found"
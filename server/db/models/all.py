@@ -1,14 +1,16 @@
 from sqlalchemy.orm import relationship
 from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Date, func
 
-from server.config.settings import Base, engine, SessionLocal
+from server.config.settings import Base
+from server.config.sharding import shards
 
 
 class Account(Base):
     __tablename__ = "accounts"
 
     nickname = Column(String, primary_key=True, index=True)
-    credits = Column(Integer, default=0)
+    # Indexed for leaderboard rebuilds, which read accounts in credits order.
+    credits = Column(Integer, default=0, index=True)
     items = relationship("AccountItem", back_populates="account", cascade="all, delete-orphan")
 
 
@@ -17,9 +19,10 @@ class Token(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     token = Column(String, unique=True, index=True)
-    account_nickname = Column(String, ForeignKey("accounts.nickname"))
+    # Indexed for per-account token lookups and the expiry sweep.
+    account_nickname = Column(String, ForeignKey("accounts.nickname"), index=True)
     created_at = Column(DateTime, server_default=func.now())
-    expires_at = Column(DateTime)
+    expires_at = Column(DateTime, index=True)
     is_revoked = Column(Boolean, default=False)
 
     account = relationship("Account")
@@ -37,16 +40,56 @@ class AccountItem(Base):
     __tablename__ = "account_items"
 
     nickname = Column(String, ForeignKey("accounts.nickname"), primary_key=True)
-    item_key = Column(String, ForeignKey("items_master.item_key"), primary_key=True)
+    # An items_master key, but not a foreign key: the catalog lives on the
+    # catalog shard only, while account_items is on the account's shard.
+    item_key = Column(String, primary_key=True)
 
     account = relationship("Account", back_populates="items")
-    item = relationship("ItemMaster")
 
 
-def init_db():
-    Base.metadata.create_all(bind=engine)
+class CacheVersion(Base):
+    """Per-topic version counters bumped by writers to invalidate caches in other processes."""
+    __tablename__ = "cache_versions"
 
-    session = SessionLocal()
+    topic = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+class AccountChange(Base):
+    """
+    Nicknames whose balance or items changed, in commit order. Written in the
+    same transaction as the change; other processes follow it to refresh
+    their account caches and leaderboard (see server.cache.accounts).
+    """
+    __tablename__ = "account_changes"
+    # AUTOINCREMENT: ids must never be reused once old rows are pruned.
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(Integer, primary_key=True)
+    nickname = Column(String, nullable=False)
+    # Random id of the writing process (see process_origin), which already
+    # updated its own caches.
+    origin = Column(Integer, nullable=False)
+
+
+def init_db(router=None):
+    """Creates the schema on every shard; items_master exists and is seeded on the catalog shard only."""
+    router = router or shards
+    for shard in router:
+        _init_shard(shard.engine, shard.SessionLocal, catalog=shard is router.catalog)
+
+
+def _init_shard(engine, session_factory, catalog: bool):
+    tables = [table for table in Base.metadata.sorted_tables if catalog or table is not ItemMaster.__table__]
+    Base.metadata.create_all(bind=engine, tables=tables)
+    # create_all skips existing tables, so add indexes introduced since they were created.
+    for table in tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    if not catalog:
+        return
+
+    session = session_factory()
     try:
         if session.query(ItemMaster).count() == 0:
             items = [
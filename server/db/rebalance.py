@@ -0,0 +1,126 @@
+"""
+Moves accounts to the shard their nickname hashes to after SHARD_COUNT changes.
+
+    GAME_SHARD_COUNT=4 python -m server.db.rebalance --from-count 2
+
+Scans every shard file of the old and new layout and moves misplaced
+accounts together with their items and tokens. Run it with the servers
+stopped, so the credit ledger has been flushed and nothing writes
+concurrently.
+
+Each batch is first copied to its target shards (upserts, one commit per
+target) and then deleted from the source (one commit). Interrupted runs can
+simply be restarted; a batch that was copied but not yet deleted is copied
+again harmlessly.
+"""
+import argparse
+import logging
+import time
+
+from sqlalchemy import delete, select, text
+from sqlalchemy.dialects.sqlite import insert
+
+from server.config.settings import SHARD_COUNT, SQL_IN_CHUNK_SIZE
+from server.config.sharding import Shard, ShardRouter, shard_index
+from server.db.models.all import Account, AccountItem, Token, init_db
+from server.utils.logger import setup_logging
+
+logger = logging.getLogger(__name__)
+
+_accounts = Account.__table__
+_account_items = AccountItem.__table__
+_tokens = Token.__table__
+
+_upsert_account = insert(_accounts).on_conflict_do_update(
+    index_elements=["nickname"], set_={"credits": text("excluded.credits")}
+)
+_insert_item = insert(_account_items).on_conflict_do_nothing()
+_insert_token = insert(_tokens).on_conflict_do_nothing(index_elements=["token"])
+_token_columns = (
+    _tokens.c.token, _tokens.c.account_nickname, _tokens.c.created_at, _tokens.c.expires_at, _tokens.c.is_revoked,
+)
+
+
+def _move(source: Shard, router: ShardRouter, nicknames: list[str], to_count: int, stats: dict):
+    with source.read_engine.connect() as conn:
+        accounts = conn.execute(select(_accounts).where(_accounts.c.nickname.in_(nicknames))).mappings().all()
+        items = conn.execute(
+            select(_account_items).where(_account_items.c.nickname.in_(nicknames))
+        ).mappings().all()
+        # Token ids are per-file autoincrement values; the target assigns new ones.
+        tokens = conn.execute(
+            select(*_token_columns).where(_tokens.c.account_nickname.in_(nicknames))
+        ).mappings().all()
+
+    targets: dict[Shard, tuple[list, list, list]] = {}
+
+    def rows_for(nickname: str) -> tuple[list, list, list]:
+        return targets.setdefault(router[shard_index(nickname, to_count)], ([], [], []))
+
+    for row in accounts:
+        rows_for(row["nickname"])[0].append(dict(row))
+    for row in items:
+        rows_for(row["nickname"])[1].append(dict(row))
+    for row in tokens:
+        rows_for(row["account_nickname"])[2].append(dict(row))
+
+    for target, (target_accounts, target_items, target_tokens) in targets.items():
+        with target.engine.begin() as conn:
+            conn.execute(_upsert_account, target_accounts)
+            if target_items:
+                conn.execute(_insert_item, target_items)
+            if target_tokens:
+                conn.execute(_insert_token, target_tokens)
+
+    with source.engine.begin() as conn:
+        conn.execute(delete(_account_items).where(_account_items.c.nickname.in_(nicknames)))
+        conn.execute(delete(_tokens).where(_tokens.c.account_nickname.in_(nicknames)))
+        conn.execute(delete(_accounts).where(_accounts.c.nickname.in_(nicknames)))
+
+    stats["accounts"] += len(accounts)
+    stats["items"] += len(items)
+    stats["tokens"] += len(tokens)
+
+
+def rebalance(from_count: int, to_count: int = SHARD_COUNT, batch_size: int = SQL_IN_CHUNK_SIZE) -> dict:
+    router = ShardRouter(max(from_count, to_count))
+    init_db(router)
+    stats = {"scanned": 0, "accounts": 0, "items": 0, "tokens": 0}
+
+    for source in router:
+        last = ""
+        while True:
+            # Keyset pagination stays correct while moved accounts are deleted behind it.
+            with source.read_engine.connect() as conn:
+                nicknames = list(conn.scalars(
+                    select(_accounts.c.nickname)
+                    .where(_accounts.c.nickname > last)
+                    .order_by(_accounts.c.nickname)
+                    .limit(batch_size)
+                ))
+            if not nicknames:
+                break
+            last = nicknames[-1]
+            stats["scanned"] += len(nicknames)
+            misplaced = [nickname for nickname in nicknames if shard_index(nickname, to_count) != source.index]
+            if misplaced:
+                _move(source, router, misplaced, to_count, stats)
+        logger.info("Shard %d done: %s", source.index, stats)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--from-count", type=int, required=True, help="shard count the data was written with")
+    parser.add_argument("--to-count", type=int, default=SHARD_COUNT, help="target shard count (GAME_SHARD_COUNT)")
+    parser.add_argument("--batch-size", type=int, default=SQL_IN_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+    setup_logging()
+
+    started = time.perf_counter()
+    stats = rebalance(args.from_count, args.to_count, min(args.batch_size, SQL_IN_CHUNK_SIZE))
+    logger.info("Rebalance finished in %.2fs: %s", time.perf_counter() - started, stats)
+
+
+if __name__ == "__main__":
+    main()
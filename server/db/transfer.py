@@ -0,0 +1,238 @@
+"""
+Streaming import/export between account snapshots and the database.
+
+Snapshot format (as in accounts.json):
+
+    {"nickname": {"credits": 806, "items": ["sword", ...]}, ...}
+
+    python -m server.db.transfer import accounts.json
+    python -m server.db.transfer export accounts.json
+
+Import parses the file incrementally and upserts accounts in executemany
+batches on their shards, committing every few batches; export streams a
+server-side cursor per shard straight to the output file. Memory use is
+bounded by the batch size, not by the snapshot size.
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+from contextlib import ExitStack
+from typing import IO, Iterator
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects.sqlite import insert
+
+from server.config.sharding import Shard, ShardRouter, shards
+from server.db.models.all import Account, AccountItem, ItemMaster, init_db
+from server.utils.logger import setup_logging
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 5000
+BATCHES_PER_TRANSACTION = 20
+READ_CHUNK_SIZE = 1 << 16
+
+_upsert_account = insert(Account.__table__).on_conflict_do_update(
+    index_elements=["nickname"], set_={"credits": text("excluded.credits")}
+)
+_insert_item = insert(AccountItem.__table__).on_conflict_do_nothing()
+
+
+class SnapshotFormatError(ValueError):
+    pass
+
+
+class _ObjectStream:
+    """Incremental reader of the members of one top-level JSON object."""
+    def __init__(self, f: IO[str], chunk_size: int):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _skip_whitespace(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self._fill():
+                return
+
+    def _expect(self, *chars: str) -> str:
+        self._skip_whitespace()
+        if self.pos >= len(self.buffer):
+            raise SnapshotFormatError(f"Unexpected end of snapshot, expected one of {chars}")
+        char = self.buffer[self.pos]
+        if char not in chars:
+            raise SnapshotFormatError(f"Expected one of {chars}, got {char!r}")
+        self.pos += 1
+        return char
+
+    def _value(self):
+        self._skip_whitespace()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as e:
+                if self._fill():
+                    continue
+                raise SnapshotFormatError(str(e)) from e
+            # A value ending exactly at the buffer edge may be a truncated number.
+            if end == len(self.buffer) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def items(self) -> Iterator[tuple[str, object]]:
+        self._expect("{")
+        self._skip_whitespace()
+        if self.buffer[self.pos:self.pos + 1] == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self._value()
+            if not isinstance(key, str):
+                raise SnapshotFormatError("Object keys must be strings")
+            self._expect(":")
+            yield key, self._value()
+            if self._expect(",", "}") == "}":
+                return
+
+
+def iter_snapshot(f: IO[str], chunk_size: int = READ_CHUNK_SIZE) -> Iterator[tuple[str, int, list]]:
+    """Yields (nickname, credits, items) from a snapshot without loading it whole."""
+    for nickname, account in _ObjectStream(f, chunk_size).items():
+        if not isinstance(account, dict):
+            raise SnapshotFormatError(f"Account {nickname!r} must be an object")
+        yield nickname, int(account.get("credits", 0)), list(account.get("items") or [])
+
+
+class _ShardImport:
+    """Batches and transaction of one shard during an import."""
+    def __init__(self, conn, stats: dict, batches_per_transaction: int):
+        self.conn = conn
+        self.stats = stats
+        self.batches_per_transaction = batches_per_transaction
+        self.transaction = conn.begin()
+        self.accounts, self.items = [], []
+        self.batches = 0
+
+    def flush(self):
+        if self.accounts:
+            self.conn.execute(_upsert_account, self.accounts)
+        if self.items:
+            self.conn.execute(_insert_item, self.items)
+        self.stats["accounts"] += len(self.accounts)
+        self.stats["items"] += len(self.items)
+        self.accounts, self.items = [], []
+        self.batches += 1
+        if self.batches % self.batches_per_transaction == 0:
+            self.transaction.commit()
+            self.transaction = self.conn.begin()
+            logger.info("Imported %d accounts", self.stats["accounts"])
+
+
+def import_accounts(f: IO[str], batch_size: int = BATCH_SIZE,
+                    batches_per_transaction: int = BATCHES_PER_TRANSACTION, router: ShardRouter = shards) -> dict:
+    init_db(router)
+    with router.catalog.read_engine.connect() as conn:
+        known_items = set(conn.scalars(select(ItemMaster.item_key)))
+
+    stats = {"accounts": 0, "items": 0, "skipped_items": 0}
+    with ExitStack() as stack:
+        imports: dict[Shard, _ShardImport] = {}
+        try:
+            for nickname, credits, owned in iter_snapshot(f):
+                shard = router.for_nickname(nickname)
+                target = imports.get(shard)
+                if target is None:
+                    conn = stack.enter_context(shard.engine.connect())
+                    target = imports[shard] = _ShardImport(conn, stats, batches_per_transaction)
+                target.accounts.append({"nickname": nickname, "credits": credits})
+                for item_key in owned:
+                    if item_key in known_items:
+                        target.items.append({"nickname": nickname, "item_key": item_key})
+                    else:
+                        stats["skipped_items"] += 1
+                if len(target.accounts) >= batch_size:
+                    target.flush()
+            for target in imports.values():
+                target.flush()
+                target.transaction.commit()
+        except Exception:
+            for target in imports.values():
+                if target.transaction.is_active:
+                    target.transaction.rollback()
+            raise
+    return stats
+
+
+def export_accounts(f: IO[str], batch_size: int = BATCH_SIZE, router: ShardRouter = shards) -> dict:
+    stats = {"accounts": 0, "items": 0}
+    query = (
+        select(Account.nickname, Account.credits, AccountItem.item_key)
+        .outerjoin(AccountItem, AccountItem.nickname == Account.nickname)
+        .order_by(Account.nickname)
+    )
+
+    def write_account(nickname, credits, owned):
+        prefix = "\n" if stats["accounts"] == 0 else ",\n"
+        f.write(f'{prefix}  {json.dumps(nickname, ensure_ascii=False)}: '
+                f'{json.dumps({"credits": credits, "items": owned}, ensure_ascii=False)}')
+        stats["accounts"] += 1
+        stats["items"] += len(owned)
+
+    f.write("{")
+    for shard in router:
+        with shard.read_engine.connect() as conn:
+            rows = conn.execution_options(stream_results=True, yield_per=batch_size).execute(query)
+            current, credits, owned = None, 0, []
+            for nickname, account_credits, item_key in rows:
+                if nickname != current:
+                    if current is not None:
+                        write_account(current, credits, owned)
+                    current, credits, owned = nickname, account_credits, []
+                if item_key is not None:
+                    owned.append(item_key)
+            if current is not None:
+                write_account(current, credits, owned)
+    f.write("\n}\n" if stats["accounts"] else "}\n")
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("import", "export"))
+    parser.add_argument("path", help="snapshot file ('-' for stdin/stdout)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args(argv)
+    setup_logging()
+
+    started = time.perf_counter()
+    if args.command == "import":
+        f = sys.stdin if args.path == "-" else open(args.path, encoding="utf-8")
+        with f:
+            stats = import_accounts(f, batch_size=args.batch_size)
+    else:
+        f = sys.stdout if args.path == "-" else open(args.path, "w", encoding="utf-8")
+        with f:
+            stats = export_accounts(f, batch_size=args.batch_size)
+    logger.info("%s finished in %.2fs: %s", args.command, time.perf_counter() - started, stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import asyncio
+import logging
+
+from fastapi import HTTPException
+
+from server.cache.accounts import account_cache
+from server.cache.catalog import catalog
+from server.config.sharding import ShardRouter, shards
+from server.db.managers.account_manager import AccountManager
+from server.db.managers.trade_manager import TradeManager, TradeResult
+from server.utils.logger import RateLimitedLogger
+
+logger = logging.getLogger(__name__)
+rate_limited_logger = RateLimitedLogger(logger)
+
+# Actions on behalf of a player; only allowed for nicknames logged in on the connection.
+PLAYER_ACTIONS = frozenset({"buy", "sell", "inventory", "logout"})
+
+
+class GameSession:
+    """Per-connection state, touched only on the event loop so it needs no locking."""
+    __slots__ = ("players",)
+
+    def __init__(self):
+        # Nicknames logged in on this connection; a bot pool multiplexes several.
+        self.players: set[str] = set()
+
+
+class GameHandlers:
+    """
+    Maps game protocol actions to AccountManager / TradeManager calls and the catalog cache.
+
+    The managers are synchronous, so every call runs in the default executor
+    with its own session on the shard owning the nickname; the executor size
+    bounds concurrent DB work independently of the number of connected players.
+    Only trades and account creation use the shard's write engine; lookups and
+    cache misses read through the read engine.
+
+    A connection acts only for the players that logged in on it: buy, sell,
+    inventory and logout for any other nickname are rejected.
+
+    buy/sell replies carry the account's inventory from the shared account
+    cache, which every trade in this process writes through, so it is right
+    whichever connection the other trades came from.
+
+    Successful replies carry `catalog_version` (the catalog ETag) so clients
+    can keep their copy of `all_items` and refetch it with the `catalog`
+    action only when the version changes.
+    """
+    def __init__(self, router: ShardRouter = shards):
+        self.shards = router
+        self.catalog_session_factory = router.catalog.ReadSessionLocal
+
+    async def handle(self, request: dict, session: GameSession | None = None) -> dict:
+        """`session` is None only for trusted in-process callers."""
+        action = request.get("action")
+        handler = self.ACTIONS.get(action) if isinstance(action, str) else None
+        if handler is None:
+            return {"status": "error", "error": f"Unknown action: {action}"}
+        if session is not None and action in PLAYER_ACTIONS:
+            nickname = request.get("nickname")
+            if not isinstance(nickname, str) or nickname.strip() not in session.players:
+                return {"status": "error", "error": f"Not logged in as {nickname} on this connection"}
+        try:
+            response = await asyncio.to_thread(handler, self, request)
+        except HTTPException as http_exc:
+            return {"status": "error", "error": str(http_exc.detail)}
+        except Exception as exc:
+            rate_limited_logger.error((action, type(exc)), "Game action %s failed", action, exc_info=exc)
+            return {"status": "error", "error": "Internal error"}
+        if session is not None and response.get("status") == "ok":
+            if action == "login":
+                session.players.add(response["nickname"])
+            elif action == "logout":
+                session.players.discard(response["nickname"])
+        if response.get("status") == "ok" and "catalog_version" not in response:
+            snapshot = catalog.peek()
+            if snapshot is not None:
+                response["catalog_version"] = snapshot.etag
+        return response
+
+    def _run(self, func, nickname: str, write: bool = False):
+        shard = self.shards.for_nickname(nickname)
+        db = shard.SessionLocal() if write else shard.ReadSessionLocal()
+        try:
+            return func(AccountManager(db), nickname)
+        finally:
+            db.close()
+
+    def _lookup(self, nickname: str):
+        """The cached account, filled through the read engine on a miss."""
+        account = account_cache.get(nickname)
+        if account is None:
+            account = self._run(AccountManager.get_account_by_nickname, nickname)
+        return account
+
+    def _trade(self, trade: str, nickname: str, item_key: str) -> dict:
+        db = self.shards.for_nickname(nickname).SessionLocal()
+        try:
+            manager = TradeManager(db, self.catalog_session_factory)
+            result: TradeResult = getattr(manager, trade)(nickname, item_key)
+        finally:
+            db.close()
+        # Written through by the trade, so usually a cache hit.
+        account = self._lookup(nickname)
+        return {
+            "status": "ok",
+            "nickname": result.nickname,
+            "credits": result.credits,
+            "item": result.item_key,
+            "items_owned": list(account.item_keys) if account is not None else [],
+        }
+
+    def _login(self, request: dict) -> dict:
+        nickname = _require(request, "nickname")
+        # The login bonus goes through the credit ledger: an existing account
+        # only needs a read.
+        account = self._run(AccountManager.update_account_on_login, nickname)
+        if account is None:
+            try:
+                account = self._run(AccountManager.create_account, nickname, write=True)
+            except HTTPException:
+                # Lost a race with a concurrent first login of the same nickname.
+                account = self._run(AccountManager.update_account_on_login, nickname)
+                if account is None:
+                    raise
+        response = self._account_payload(account)
+        response.update(self._catalog_payload())
+        return response
+
+    def _catalog(self, request: dict) -> dict:
+        return {"status": "ok", **self._catalog_payload()}
+
+    def _logout(self, request: dict) -> dict:
+        nickname = _require(request, "nickname")
+        return {"status": "ok", "nickname": nickname, "message": f"Logout выполнен для {nickname}."}
+
+    def _inventory(self, request: dict) -> dict:
+        account = self._lookup(_require(request, "nickname"))
+        if account is None:
+            raise HTTPException(status_code=404, detail="Account not found")
+        return self._account_payload(account)
+
+    def _buy(self, request: dict) -> dict:
+        return self._trade("buy", _require(request, "nickname"), _require(request, "item"))
+
+    def _sell(self, request: dict) -> dict:
+        return self._trade("sell", _require(request, "nickname"), _require(request, "item"))
+
+    def _catalog_payload(self) -> dict:
+        snapshot = catalog.get(self.catalog_session_factory)
+        return {
+            "all_items": {key: item["price"] for key, item in snapshot.items.items()},
+            "catalog_version": snapshot.etag,
+        }
+
+    @staticmethod
+    def _account_payload(account) -> dict:
+        return {
+            "status": "ok",
+            "nickname": account.nickname,
+            "credits": account.credits,
+            "items_owned": list(account.item_keys),
+        }
+
+    ACTIONS = {
+        "login": _login,
+        "logout": _logout,
+        "catalog": _catalog,
+        "inventory": _inventory,
+        "buy": _buy,
+        "sell": _sell,
+    }
+
+
+def _require(request: dict, field: str) -> str:
+    value = request.get(field)
+    if not isinstance(value, str) or not value.strip():
+        raise HTTPException(status_code=400, detail=f"Field '{field}' is required")
+    return value.strip()
+
@@ -0,0 +1,89 @@
+"""
+Game wire protocol.
+
+A connection starts in line mode: one JSON object per line. The client may
+switch it to framed mode with a `hello` request:
+
+    {"action": "hello", "framing": "length", "encodings": ["msgpack", "json"]}
+
+The server answers (still as a line) with the encoding it picked, and from
+then on every message in both directions is a 4-byte big-endian payload
+length followed by the encoded payload. Requests may carry an `id` which is
+echoed in the response; framed requests are served concurrently, so replies
+can arrive out of order.
+"""
+import asyncio
+import json
+import struct
+
+from server.utils.response_handlers import dumps
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional; JSON is always available.
+    msgpack = None
+
+FRAME_HEADER = struct.Struct("!I")
+
+
+class FrameTooLarge(Exception):
+    pass
+
+
+class JsonCodec:
+    name = "json"
+
+    @staticmethod
+    def encode(message: dict) -> bytes:
+        return dumps(message)
+
+    @staticmethod
+    def decode(payload: bytes):
+        return json.loads(payload)
+
+
+class MsgpackCodec:
+    name = "msgpack"
+
+    @staticmethod
+    def encode(message: dict) -> bytes:
+        return msgpack.packb(message, use_bin_type=True)
+
+    @staticmethod
+    def decode(payload: bytes):
+        return msgpack.unpackb(payload, raw=False)
+
+
+CODECS = {JsonCodec.name: JsonCodec}
+if msgpack is not None:
+    CODECS[MsgpackCodec.name] = MsgpackCodec
+
+
+def negotiate_codec(offered) -> type[JsonCodec] | type[MsgpackCodec]:
+    """First encoding in the client's preference list that this server supports."""
+    for name in offered or ():
+        if name in CODECS:
+            return CODECS[name]
+    return JsonCodec
+
+
+def encode_frame(codec, message: dict) -> bytes:
+    payload = codec.encode(message)
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+async def read_frame(reader: asyncio.StreamReader, max_size: int) -> bytes | None:
+    """Returns the next frame payload, or None on a clean EOF between frames."""
+    try:
+        header = await reader.readexactly(FRAME_HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            raise ConnectionError("Connection closed mid-frame")
+        return None
+    (size,) = FRAME_HEADER.unpack(header)
+    if size > max_size:
+        raise FrameTooLarge(size)
+    try:
+        return await reader.readexactly(size)
+    except asyncio.IncompleteReadError:
+        raise ConnectionError("Connection closed mid-frame")
@@ -0,0 +1,222 @@
+import asyncio
+import json
+import logging
+
+from server.config.settings import (
+    HOST, PORT, GAME_MAX_CONNECTIONS, GAME_MAX_REQUEST_BYTES, GAME_MAX_INFLIGHT, GAME_WRITE_BUFFER_HIGH,
+    GAME_IDLE_TIMEOUT_SECONDS
+)
+from server.game.handlers import GameHandlers, GameSession
+from server.game.protocol import FrameTooLarge, encode_frame, negotiate_codec, read_frame
+from server.utils.response_handlers import dumps
+
+logger = logging.getLogger(__name__)
+
+
+class GameServer:
+    """
+    asyncio TCP server for the game protocol (see server.game.protocol).
+
+    One coroutine per connection; a request larger than `max_request_bytes`
+    closes the connection, and every reply waits on `drain()` so a slow
+    reader cannot grow its write buffer past `write_buffer_high`.
+    """
+    def __init__(
+            self,
+            handlers: GameHandlers,
+            host: str = HOST,
+            port: int = PORT,
+            max_connections: int = GAME_MAX_CONNECTIONS,
+            max_request_bytes: int = GAME_MAX_REQUEST_BYTES,
+            max_inflight: int = GAME_MAX_INFLIGHT,
+            write_buffer_high: int = GAME_WRITE_BUFFER_HIGH,
+            idle_timeout: float = GAME_IDLE_TIMEOUT_SECONDS,
+    ):
+        self.handlers = handlers
+        self.host = host
+        self.port = port
+        self.max_connections = max_connections
+        self.max_request_bytes = max_request_bytes
+        self.max_inflight = max_inflight
+        self.write_buffer_high = write_buffer_high
+        self.idle_timeout = idle_timeout
+        self.connections = 0
+        self._server: asyncio.Server | None = None
+        self._clients: set[asyncio.Task] = set()
+
+    async def start(self):
+        self._server = await asyncio.start_server(
+            self._handle_client, self.host, self.port, limit=self.max_request_bytes
+        )
+        logger.info("Game server listening on %s:%s", self.host, self.port)
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self, grace: float = 5.0):
+        if self._server is not None:
+            self._server.close()
+            # Let connections that are already closing finish their own cleanup.
+            if self._clients:
+                await asyncio.wait(self._clients, timeout=grace)
+            await self._server.wait_closed()
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        if self.connections >= self.max_connections:
+            await self._send(writer, {"status": "error", "error": "Server is full"})
+            await self._close(writer)
+            return
+
+        self.connections += 1
+        task = asyncio.current_task()
+        self._clients.add(task)
+        task.add_done_callback(self._clients.discard)
+        writer.transport.set_write_buffer_limits(high=self.write_buffer_high)
+        session = GameSession()
+        try:
+            codec = await self._serve_lines(reader, writer, session)
+            if codec is not None:
+                await self._serve_frames(reader, writer, codec, session)
+        except ConnectionError:
+            pass
+        except Exception:
+            logger.exception("Unexpected error in game connection")
+        finally:
+            self.connections -= 1
+            await self._close(writer)
+
+    async def _serve_lines(
+            self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, session: GameSession
+    ):
+        """
+        Line mode: requests are answered one at a time, in order.
+        Returns the negotiated codec if the client switched to framed mode.
+        """
+        while True:
+            try:
+                line = await asyncio.wait_for(reader.readline(), self.idle_timeout)
+            except (asyncio.LimitOverrunError, ValueError):
+                await self._send(writer, {"status": "error", "error": "Request too large"})
+                return None
+            except asyncio.TimeoutError:
+                return None
+            if not line:
+                return None
+
+            try:
+                request = json.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                await self._send(writer, {"status": "error", "error": "Invalid JSON"})
+                continue
+            if not isinstance(request, dict):
+                await self._send(writer, {"status": "error", "error": "Request must be an object"})
+                continue
+
+            action = request.get("action")
+            if action == "quit":
+                await self._send(writer, _reply(request, {"status": "ok", "message": "Bye"}))
+                return None
+            if action == "hello" and request.get("framing") == "length":
+                codec = negotiate_codec(request.get("encodings"))
+                await self._send(writer, _reply(request, {
+                    "status": "ok", "framing": "length", "encoding": codec.name,
+                    "max_frame_bytes": self.max_request_bytes,
+                }))
+                return codec
+            await self._send(writer, _reply(request, await self._handle(request, session)))
+
+    async def _serve_frames(
+            self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, codec, session: GameSession
+    ):
+        """
+        Framed mode: each request is handled in its own task and answered as
+        soon as it completes. Reading pauses while `max_inflight` requests are
+        outstanding, which pushes back on pipelining clients through TCP.
+        """
+        inflight = asyncio.Semaphore(self.max_inflight)
+        tasks = set()
+        try:
+            while True:
+                try:
+                    payload = await asyncio.wait_for(read_frame(reader, self.max_request_bytes), self.idle_timeout)
+                except FrameTooLarge:
+                    await self._send_frame(writer, codec, {"status": "error", "error": "Request too large"})
+                    return
+                except asyncio.TimeoutError:
+                    return
+                if payload is None:
+                    return
+
+                try:
+                    request = codec.decode(payload)
+                except Exception:
+                    await self._send_frame(writer, codec, {"status": "error", "error": "Invalid payload"})
+                    continue
+                if not isinstance(request, dict):
+                    await self._send_frame(writer, codec, {"status": "error", "error": "Request must be an object"})
+                    continue
+
+                if request.get("action") == "quit":
+                    await asyncio.gather(*tasks, return_exceptions=True)
+                    await self._send_frame(writer, codec, _reply(request, {"status": "ok", "message": "Bye"}))
+                    return
+
+                await inflight.acquire()
+                task = asyncio.create_task(self._answer_frame(writer, codec, request, session, inflight))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _answer_frame(
+            self,
+            writer: asyncio.StreamWriter,
+            codec,
+            request: dict,
+            session: GameSession,
+            inflight: asyncio.Semaphore,
+    ):
+        try:
+            response = await self._handle(request, session)
+            await self._send_frame(writer, codec, _reply(request, response))
+        except ConnectionError:
+            # The read loop sees the closed connection and stops.
+            pass
+        finally:
+            inflight.release()
+
+    async def _handle(self, request: dict, session: GameSession) -> dict:
+        """Every request gets a reply: a failing handler answers with an error instead."""
+        try:
+            return await self.handlers.handle(request, session)
+        except Exception:
+            logger.exception("Unexpected error handling action %r", request.get("action"))
+            return {"status": "error", "error": "Internal error"}
+
+    @staticmethod
+    async def _send_frame(writer: asyncio.StreamWriter, codec, response: dict):
+        writer.write(encode_frame(codec, response))
+        await writer.drain()
+
+    @staticmethod
+    async def _send(writer: asyncio.StreamWriter, response: dict):
+        writer.write(dumps(response) + b"\n")
+        await writer.drain()
+
+    @staticmethod
+    async def _close(writer: asyncio.StreamWriter):
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+def _reply(request: dict, response: dict) -> dict:
+    if "id" in request:
+        response["id"] = request["id"]
+    return response
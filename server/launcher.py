@@ -0,0 +1,40 @@
+"""
+Multi-process launcher for the HTTP API.
+
+    python -m server.launcher --workers 4 --port 8000
+
+Starts `--workers` uvicorn worker processes sharing the listening socket;
+each worker creates/seeds the schema and warms its caches in the app
+lifespan. Equivalent Gunicorn invocation:
+
+    gunicorn -k uvicorn.workers.UvicornWorker -w 4 -b 0.0.0.0:8000 server_main:app
+
+Per-worker caches (item catalog, token revocations) stay coherent through the
+invalidation channel in server.cache.invalidation.
+"""
+import argparse
+
+from server.config.settings import WORKERS
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    uvicorn.run(
+        "server_main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        log_level=args.log_level,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,71 +1,80 @@
 import logging
-from functools import wraps
-from fastapi import HTTPException
-from fastapi.responses import JSONResponse
-from typing import Callable, Any
+
+from fastapi import FastAPI, HTTPException
+from starlette.exceptions import HTTPException as StarletteHTTPException
 from starlette.requests import Request
+from starlette.responses import Response
+
+from server.utils.logger import RateLimitedLogger
+from server.utils.response_handlers import dumps
 
 logger = logging.getLogger(__name__)
+rate_limited_logger = RateLimitedLogger(logger)
 
+INTERNAL_SERVER_ERROR = "Internal Server Error"
 
-def handle_exceptions(func: Callable) -> Callable:
-    """
-    Decorator to handle exceptions in API routes with detailed error reporting.
+# Errors that show up in bursts (failed logins, duplicate nicknames, crashes)
+# have their bodies encoded once at import time.
+_COMMON_ERRORS = (
+    (400, "Nickname already exists"),
+    (401, "Could not validate credentials"),
+    (401, "Not authenticated"),
+    (401, "Some Error occurred!"),
+    (404, "Not Found"),
+    (429, "Too Many Requests"),
+)
+_MAX_CACHED_BODIES = 256
 
-    Args:
-        func: The function to decorate
 
-    Returns:
-        Callable: Wrapped function with exception handling
-    """
+def _encode_error(status_code: int, message: str, details=None, with_details: bool = False) -> bytes:
+    error = {"message": message, "code": status_code}
+    if with_details:
+        error["details"] = details
+    return dumps({"error": error})
+
+
+_bodies: dict[tuple[int, str], bytes] = {
+    (status_code, message): _encode_error(status_code, message) for status_code, message in _COMMON_ERRORS
+}
+_INTERNAL_ERROR_BODY = _encode_error(500, INTERNAL_SERVER_ERROR, with_details=True)
+
+
+def error_response(status_code: int, message: str, headers: dict | None = None) -> Response:
+    key = (status_code, message)
+    body = _bodies.get(key)
+    if body is None:
+        body = _encode_error(status_code, message)
+        if len(_bodies) < _MAX_CACHED_BODIES:
+            _bodies[key] = body
+    return Response(content=body, status_code=status_code, headers=headers, media_type="application/json")
+
 
-    @wraps(func)  # Preserves the metadata of the original function
-    async def wrapper(*args, **kwargs) -> JSONResponse:
-        # Try to extract request from args/kwargs for context
-        request = next(
-            (arg for arg in args if isinstance(arg, Request)), None
-        ) or kwargs.get('request')
-
-        try:
-            return await func(*args, **kwargs)
-
-        except HTTPException as http_exc:
-            logger.warning(f"HTTP Exception: {http_exc.detail}")
-            return JSONResponse(
-                status_code=http_exc.status_code,
-                content={
-                    "error": {
-                        "message": str(http_exc.detail),
-                        "code": http_exc.status_code
-                    }
-                }
-            )
-
-        except ValueError as ve:
-            logger.warning(f"Validation Error: {str(ve)}")
-            return JSONResponse(
-                status_code=400,
-                content={
-                    "error": {
-                        "message": str(ve),
-                        "code": 400
-                    }
-                }
-            )
-
-        except Exception as e:
-            error_msg = f"Unexpected error in {func.__name__}: {str(e)}"
-            logger.error(error_msg, exc_info=True)  # Log full stack trace
-            return JSONResponse(
-                status_code=500,
-                content={
-                    "error": {
-                        "message": "Internal Server Error",
-                        "code": 500,
-                        "details": str(e) if request and request.app.debug else None
-                    }
-                }
-            )
-
-    return wrapper
+async def http_exception_handler(request: Request, exc: StarletteHTTPException) -> Response:
+    rate_limited_logger.warning((exc.status_code, exc.detail), "HTTP Exception: %s", exc.detail)
+    return error_response(exc.status_code, str(exc.detail), exc.headers)
 
+
+async def value_error_handler(request: Request, exc: ValueError) -> Response:
+    rate_limited_logger.warning((400, type(exc)), "Validation Error: %s", exc)
+    return error_response(400, str(exc))
+
+
+def internal_error_body(exc: Exception, debug: bool) -> bytes:
+    if debug:
+        return _encode_error(500, INTERNAL_SERVER_ERROR, details=str(exc), with_details=True)
+    return _INTERNAL_ERROR_BODY
+
+
+def log_unhandled(method: str, path: str, exc: Exception):
+    rate_limited_logger.error((500, type(exc)), "Unexpected error in %s %s", method, path, exc_info=exc)
+
+
+def register_exception_handlers(app: FastAPI):
+    """
+    App-level replacements for the old per-service `handle_exceptions`
+    decorator; the error body shape ({"error": {"message", "code"}}) is unchanged.
+    Unhandled exceptions are answered by server.config.middlewares.UnhandledErrorMiddleware.
+    """
+    app.add_exception_handler(StarletteHTTPException, http_exception_handler)
+    app.add_exception_handler(HTTPException, http_exception_handler)
+    app.add_exception_handler(ValueError, value_error_handler)
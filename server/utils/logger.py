@@ -0,0 +1,47 @@
+import logging
+import time
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+
+def setup_logging(level: int | str = logging.INFO):
+    logging.basicConfig(level=level, format=LOG_FORMAT)
+
+
+class RateLimitedLogger:
+    """
+    Emits at most `burst` records per `key` every `interval` seconds and folds
+    the rest into a single "suppressed" line when the window rolls over.
+    Formatting stays lazy (%-style args), and nothing is done at all when the
+    level is disabled.
+    """
+    def __init__(self, logger: logging.Logger, interval: float = 10.0, burst: int = 5):
+        self.logger = logger
+        self.interval = interval
+        self.burst = burst
+        # key -> [window start, emitted, suppressed]
+        self._windows: dict[object, list] = {}
+
+    def log(self, level: int, key, msg: str, *args, **kwargs):
+        if not self.logger.isEnabledFor(level):
+            return
+        now = time.monotonic()
+        window = self._windows.get(key)
+        if window is None or now - window[0] >= self.interval:
+            if window is not None and window[2]:
+                self.logger.log(level, "Suppressed %d similar messages for %r in the last %.0fs",
+                                window[2], key, now - window[0])
+            if len(self._windows) > 1024:
+                self._windows.clear()
+            window = self._windows[key] = [now, 0, 0]
+        if window[1] >= self.burst:
+            window[2] += 1
+            return
+        window[1] += 1
+        self.logger.log(level, msg, *args, **kwargs)
+
+    def warning(self, key, msg: str, *args, **kwargs):
+        self.log(logging.WARNING, key, msg, *args, **kwargs)
+
+    def error(self, key, msg: str, *args, **kwargs):
+        self.log(logging.ERROR, key, msg, *args, **kwargs)
@@ -0,0 +1,158 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(key)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    def set(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = value
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_labels(key + (('le', le),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(key)} {series[-1]}")
+            lines.append(f"{self.name}_count{_labels(key)} {cumulative}")
+        return lines
+
+
+def _labels(key: tuple) -> str:
+    if not key:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in key) + "}"
+
+
+http_request_seconds = Histogram("http_request_seconds", "HTTP request latency by route.")
+http_requests_total = Counter("http_requests_total", "HTTP requests by route and status.")
+db_statement_seconds = Histogram("db_statement_seconds", "SQL statement execution time.")
+db_statements_per_request = Histogram(
+    "db_statements_per_request", "SQL statements executed per HTTP request.",
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+db_seconds_per_request = Histogram("db_seconds_per_request", "Time spent in SQL per HTTP request.")
+jwt_seconds = Histogram(
+    "jwt_seconds", "JWT encode/decode time.", buckets=(0.00001, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.005)
+)
+rate_limited_total = Counter("rate_limited_total", "Requests rejected with 429 by reason.")
+tokens_rows = Gauge("tokens_rows", "Rows in the tokens table after the last sweep.")
+tokens_swept_total = Counter("tokens_swept_total", "Expired token rows deleted by the sweeper.")
+startup_seconds = Gauge("startup_seconds", "Time spent in each startup phase of this process.")
+account_cache_hits_total = Counter("account_cache_hits_total", "Account lookups served from the account cache.")
+account_cache_misses_total = Counter("account_cache_misses_total", "Account lookups that missed the account cache.")
+account_cache_evictions_total = Counter(
+    "account_cache_evictions_total", "Least recently used records evicted from the account cache."
+)
+
+REGISTRY = [
+    http_request_seconds, http_requests_total, db_statement_seconds,
+    db_statements_per_request, db_seconds_per_request, jwt_seconds, rate_limited_total,
+    tokens_rows, tokens_swept_total, startup_seconds,
+    account_cache_hits_total, account_cache_misses_total, account_cache_evictions_total,
+]
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class RequestStats:
+    __slots__ = ("statements", "db_seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+
+
+# Set by the metrics middleware for the duration of a request; propagated into
+# executor threads and SQLAlchemy's async greenlets with the context.
+current_request_stats: ContextVar[RequestStats | None] = ContextVar("current_request_stats", default=None)
+
+
+def instrument_engine(engine):
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        db_statement_seconds.observe(elapsed)
+        stats = current_request_stats.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.db_seconds += elapsed
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _on_error(context):
+        started = context.connection.info.get("query_started") if context.connection is not None else None
+        if started:
+            started.pop()
@@ -0,0 +1,60 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+
+class SamplingProfiler:
+    """
+    Low-overhead sampler of the event loop thread's Python stack.
+
+    While enabled, a daemon thread records the loop thread's stack every
+    `interval` seconds into a bounded ring. `dump()` writes the samples taken
+    during a time window as collapsed stacks (one `frame;frame;... count`
+    line per stack), the input format of flamegraph.pl / speedscope.
+    Samples cover everything the loop ran in that window, not just one request.
+    """
+    def __init__(self, interval: float, max_samples: int = 100_000):
+        self.interval = interval
+        self._samples: deque[tuple[float, tuple]] = deque(maxlen=max_samples)
+        self._target_thread_id: int | None = None
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self, target_thread_id: int | None = None):
+        if self._thread is not None:
+            return
+        self._target_thread_id = target_thread_id or threading.get_ident()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def dump(self, path: str, started: float, finished: float) -> int:
+        stacks = Counter(stack for timestamp, stack in list(self._samples) if started <= timestamp <= finished)
+        if not stacks:
+            return 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+        return sum(stacks.values())
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self._target_thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            stack.reverse()
+            self._samples.append((time.perf_counter(), tuple(stack)))
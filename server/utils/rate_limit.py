@@ -0,0 +1,113 @@
+import asyncio
+import collections
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """Lazily refilled token bucket: `rate` tokens per second, up to `burst`."""
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic() if now is None else now
+
+    def take(self, now: float, cost: float = 1) -> bool:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < cost:
+            return False
+        self.tokens -= cost
+        return True
+
+    def retry_after(self, cost: float = 1) -> float:
+        return max(0.0, (cost - self.tokens) / self.rate) if self.rate else 0.0
+
+
+class RateLimiter:
+    """
+    Per-client and global token buckets. Only touched from the event loop,
+    so there are no locks; each check is O(1). The client table is bounded by
+    evicting the least recently seen client, which at worst gives it a fresh
+    bucket.
+    """
+    def __init__(self, rate: float, burst: float, global_rate: float, global_burst: float, max_clients: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self._clients: collections.OrderedDict[str, TokenBucket] = collections.OrderedDict()
+
+    def check(self, client: str, cost: float = 1) -> Optional[tuple[str, float]]:
+        """Takes `cost` tokens; returns None if admitted, otherwise (reason, retry after seconds)."""
+        now = time.monotonic()
+        bucket = self._clients.get(client)
+        if bucket is None:
+            if len(self._clients) >= self.max_clients:
+                self._clients.popitem(last=False)
+            bucket = self._clients[client] = TokenBucket(self.rate, self.burst, now)
+        else:
+            self._clients.move_to_end(client)
+        if not bucket.take(now, cost):
+            return "client", bucket.retry_after(cost)
+        if not self.global_bucket.take(now, cost):
+            # Give the client its tokens back; nothing was admitted.
+            bucket.tokens += cost
+            return "global", self.global_bucket.retry_after(cost)
+        return None
+
+
+class AdmissionQueue:
+    """
+    Caps concurrently running requests; excess requests wait in a bounded
+    FIFO for at most `timeout` seconds. When the queue is full, acquire()
+    fails immediately so overload is shed before any work is done.
+    """
+    def __init__(self, max_concurrent: int, max_queue: int, timeout: float):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.active = 0
+        self._waiters: collections.deque[asyncio.Future] = collections.deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> bool:
+        if self.active < self.max_concurrent and not self._waiters:
+            self.active += 1
+            return True
+        if len(self._waiters) >= self.max_queue:
+            return False
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.timeout)
+            return True
+        except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up; pass it on.
+                self.release()
+            else:
+                self._remove(waiter)
+            if isinstance(exc, asyncio.CancelledError):
+                raise
+            return False
+
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # Hand the slot straight to the next waiter; `active` is unchanged.
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def _remove(self, waiter: asyncio.Future):
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
@@ -1,9 +1,101 @@
 # server_main.py
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
 from server.api.main_router import v1_router
+from server.api.routers.metrics import metrics_routers
+from server.cache.accounts import AccountChangeFeed, account_cache
+from server.cache.catalog import catalog
+from server.cache.invalidation import ACCOUNTS, CATALOG, REVOCATIONS, InvalidationListener
+from server.cache.leaderboard import leaderboard
+from server.cache.revocation import revoked_tokens
+from server.config.middlewares import MetricsMiddleware, RateLimitMiddleware, UnhandledErrorMiddleware
+from server.config.settings import EVENT_LOG_ENABLED, INVALIDATION_POLL_SECONDS, REVOCATION_REFRESH_SECONDS, RATE_LIMIT_ENABLED, \
+    TOKEN_SWEEP_SECONDS, TOKEN_SWEEP_BATCH, TOKEN_SWEEP_PAUSE_SECONDS, LEADERBOARD_REBUILD_SECONDS, \
+    ACCOUNT_CHANGES_RETAIN, ACCOUNT_CHANGES_PRUNE_SECONDS
+from server.config.sharding import shards
+from server.config.startup import StartupTimer, warm_connections, warm_jwt
+from server.db.eventlog import event_log
+from server.db.ledger import credit_ledger
+from server.db.maintenance import AccountChangePruner, TokenSweeper
+from server.db.models.all import init_db
+from server.utils.exception_handlers import register_exception_handlers
+from server.utils.logger import setup_logging
+from server.utils.response_handlers import FastJSONResponse
 
-app = FastAPI()
+# Run under uvicorn, which only configures its own loggers.
+setup_logging()
 
-app.include_router(v1_router, prefix="/api/v1")
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    timer = StartupTimer()
+    with timer.phase("schema"):
+        # Safe with several workers: the write engines begin with BEGIN IMMEDIATE.
+        await asyncio.to_thread(init_db)
+    with timer.phase("connections"):
+        await asyncio.gather(*(warm_connections(shard.sync_engines, shard.async_engines) for shard in shards))
+    with timer.phase("catalog"):
+        await asyncio.to_thread(catalog.get, shards.catalog.ReadSessionLocal)
+    with timer.phase("jwt"):
+        warm_jwt()
+    with timer.phase("leaderboard"):
+        await asyncio.to_thread(
+            leaderboard.rebuild, [shard.ReadSessionLocal for shard in shards], credit_ledger.pending
+        )
+
+    credit_ledger.start()
+    if EVENT_LOG_ENABLED:
+        event_log.start()
+    background = [
+        asyncio.create_task(
+            revoked_tokens.run([shard.AsyncReadSessionLocal for shard in shards], REVOCATION_REFRESH_SECONDS)
+        ),
+        asyncio.create_task(leaderboard.run(
+            [shard.ReadSessionLocal for shard in shards], LEADERBOARD_REBUILD_SECONDS, credit_ledger.pending
+        )),
+    ]
+    for shard in shards:
+        # Revocations are published on the token's own shard, the catalog on shard 0.
+        invalidations = InvalidationListener(shard.db_file, INVALIDATION_POLL_SECONDS)
+        if shard is shards.catalog:
+            invalidations.subscribe(CATALOG, catalog.invalidate)
+        invalidations.subscribe(REVOCATIONS, revoked_tokens.request_refresh)
+        # Trades and logins made by the game server (or other workers).
+        account_changes = AccountChangeFeed(shard.AsyncReadSessionLocal)
+        await account_changes.start()
+        account_changes.subscribe(account_cache.invalidate)
+        account_changes.subscribe(leaderboard.follower(shard.ReadSessionLocal, credit_ledger.pending))
+        invalidations.subscribe(ACCOUNTS, account_changes.poll)
+        background.append(asyncio.create_task(invalidations.run()))
+        background.append(asyncio.create_task(
+            TokenSweeper(shard.AsyncSessionLocal, TOKEN_SWEEP_BATCH, TOKEN_SWEEP_PAUSE_SECONDS).run(TOKEN_SWEEP_SECONDS)
+        ))
+        background.append(asyncio.create_task(
+            AccountChangePruner(shard.AsyncSessionLocal, ACCOUNT_CHANGES_RETAIN).run(ACCOUNT_CHANGES_PRUNE_SECONDS)
+        ))
+    timer.report()
+    try:
+        yield
+    finally:
+        for task in background:
+            task.cancel()
+        await asyncio.gather(*background, return_exceptions=True)
+        credit_ledger.close()
+        event_log.close()
+        # Close pooled aiosqlite connections while the loop is still running.
+        await asyncio.gather(*(shard.dispose() for shard in shards))
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
+
+if RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware)
+app.add_middleware(UnhandledErrorMiddleware)
+app.add_middleware(MetricsMiddleware)
+register_exception_handlers(app)
+
+app.include_router(v1_router, prefix="/api/v1")
+app.include_router(metrics_routers)
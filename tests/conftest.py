@@ -0,0 +1,54 @@
+import os
+import sys
+import tempfile
+
+# Settings are read at import time: point every database and log at a scratch
+# directory and run with two shards before any server module is imported.
+_scratch = tempfile.mkdtemp(prefix="game-tests-")
+os.environ["GAME_DB_FILE"] = os.path.join(_scratch, "game.db")
+os.environ["GAME_SHARD_COUNT"] = "2"
+os.environ["GAME_EVENT_LOG"] = "0"
+os.environ["GAME_EVENT_LOG_DIR"] = os.path.join(_scratch, "events")
+os.environ["GAME_RATE_LIMIT"] = "0"
+os.environ["GAME_PROFILE_DUMP_DIR"] = os.path.join(_scratch, "profiles")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+from sqlalchemy import delete  # noqa: E402
+
+from server.cache.accounts import account_cache  # noqa: E402
+from server.cache.catalog import catalog  # noqa: E402
+from server.cache.revocation import revoked_tokens  # noqa: E402
+from server.config.sharding import ShardRouter, shards  # noqa: E402
+from server.db.ledger import credit_ledger  # noqa: E402
+from server.db.models.all import Account, AccountChange, AccountItem, Token, init_db  # noqa: E402
+
+# Shards a test may touch: the configured two plus one more for rebalancing.
+ALL_SHARDS = ShardRouter(3)
+
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    init_db(ALL_SHARDS)
+    credit_ledger.flush()
+    for shard in ALL_SHARDS:
+        with shard.engine.begin() as conn:
+            for table in (AccountItem.__table__, Token.__table__, Account.__table__, AccountChange.__table__):
+                conn.execute(delete(table))
+    account_cache.clear()
+    revoked_tokens.prune(float("inf"))
+    catalog.invalidate()
+    yield
+
+
+@pytest.fixture
+def make_account():
+    """Inserts an account with a fixed balance on its shard."""
+    def make(nickname: str, credits: int, items=()):
+        shard = shards.for_nickname(nickname)
+        with shard.engine.begin() as conn:
+            conn.execute(Account.__table__.insert().values(nickname=nickname, credits=credits))
+            for item_key in items:
+                conn.execute(AccountItem.__table__.insert().values(nickname=nickname, item_key=item_key))
+        return shard
+    return make
@@ -0,0 +1,65 @@
+from server.cache.accounts import account_cache
+from server.db.ledger import credit_ledger
+from server.db.managers.account_manager import AccountManager
+
+
+def lookup(shard, nickname: str):
+    db = shard.ReadSessionLocal()
+    try:
+        return AccountManager(db).get_account_by_nickname(nickname)
+    finally:
+        db.close()
+
+
+def test_miss_includes_pending_ledger_credits(make_account):
+    shard = make_account("alice", 100)
+    credit_ledger.add("alice", 20)
+
+    assert lookup(shard, "alice").credits == 120
+    assert account_cache.peek("alice").credits == 120
+
+
+def test_miss_overlapping_a_flush_reads_again(make_account, monkeypatch):
+    shard = make_account("bob", 100)
+    credit_ledger.add("bob", 20)
+    read_inventory = AccountManager.get_inventory
+
+    def read_then_flush(self, nickname):
+        # The flush takes the pending 20 and commits between the read and
+        # the pending lookup: 100 + 0 unless the read is repeated.
+        rows = read_inventory(self, nickname)
+        if credit_ledger.pending(nickname):
+            credit_ledger.flush()
+        return rows
+
+    monkeypatch.setattr(AccountManager, "get_inventory", read_then_flush)
+    assert lookup(shard, "bob").credits == 120
+    assert account_cache.peek("bob").credits == 120
+
+
+def test_settled_balance_rejects_reads_across_a_flush(make_account):
+    make_account("carol", 100)
+    credit_ledger.add("carol", 5)
+    epoch = credit_ledger.epoch
+
+    credit_ledger.flush()
+
+    assert credit_ledger.settled_balance("carol", 100, epoch) is None
+    assert credit_ledger.settled_balance("carol", 105, credit_ledger.epoch) == 105
+
+
+def test_fill_overlapping_a_change_or_eviction_is_not_cached():
+    with account_cache.filling("dave") as fill:
+        with account_cache.changing("dave"):
+            pass
+        assert fill.put(10, ()).credits == 10
+    assert account_cache.peek("dave") is None
+
+    with account_cache.filling("dave") as fill:
+        account_cache.invalidate(["dave"])
+        fill.put(10, ())
+    assert account_cache.peek("dave") is None
+
+    with account_cache.filling("dave") as fill:
+        fill.put(10, ())
+    assert account_cache.peek("dave").credits == 10
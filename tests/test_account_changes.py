@@ -0,0 +1,98 @@
+import asyncio
+import os
+
+from sqlalchemy import select, update
+
+from server.cache.accounts import AccountChangeFeed, account_cache
+from server.cache.invalidation import process_origin, publish_account_changes
+from server.cache.leaderboard import leaderboard
+from server.config.sharding import shards
+from server.db.ledger import credit_ledger
+from server.db.maintenance import AccountChangePruner
+from server.db.managers.trade_manager import TradeManager
+from server.db.models.all import Account, AccountChange
+
+
+def changed_elsewhere(nickname: str):
+    """Writes an account change the way another process would (different origin)."""
+    with shards.for_nickname(nickname).engine.begin() as conn:
+        conn.execute(AccountChange.__table__.insert().values(nickname=nickname, origin=0))
+
+
+def follow(shard) -> AccountChangeFeed:
+    feed = AccountChangeFeed(shard.AsyncReadSessionLocal, batch_size=2)
+    asyncio.run(feed.start())
+    feed.subscribe(account_cache.invalidate)
+    return feed
+
+
+def test_changes_from_other_processes_evict_cached_accounts(make_account):
+    shard = make_account("alice", 100)
+    make_account("bob", 100)
+    feed = follow(shard)
+    account_cache.put("alice", 100, ())
+    account_cache.put("bob", 100, ())
+
+    for _ in range(3):
+        changed_elsewhere("alice")
+
+    assert asyncio.run(feed.poll()) == 1
+    assert account_cache.peek("alice") is None
+    assert account_cache.peek("bob") is not None
+    # Already consumed.
+    assert asyncio.run(feed.poll()) == 0
+
+
+def test_own_changes_are_not_evicted(make_account):
+    shard = make_account("carol", 100)
+    feed = follow(shard)
+    account_cache.put("carol", 100, ())
+
+    db = shard.SessionLocal()
+    try:
+        TradeManager(db, shards.catalog.ReadSessionLocal).buy("carol", "potion")
+    finally:
+        db.close()
+
+    assert asyncio.run(feed.poll()) == 0
+    assert account_cache.peek("carol").item_keys == ("potion",)
+
+
+def test_pruner_keeps_the_newest_changes():
+    shard = shards[0]
+    with shard.engine.begin() as conn:
+        publish_account_changes(conn, [f"player-{index}" for index in range(10)])
+
+    assert asyncio.run(AccountChangePruner(shard.AsyncSessionLocal, retain=4).prune()) == 6
+    with shard.read_engine.connect() as conn:
+        remaining = conn.scalars(select(AccountChange.nickname).order_by(AccountChange.id)).all()
+    assert remaining == [f"player-{index}" for index in range(6, 10)]
+
+
+def test_leaderboard_follows_balances_changed_by_other_processes(make_account):
+    shard = make_account("erin", 10)
+    leaderboard.rebuild([s.ReadSessionLocal for s in shards])
+    feed = AccountChangeFeed(shard.AsyncReadSessionLocal)
+    asyncio.run(feed.start())
+    feed.subscribe(leaderboard.follower(shard.ReadSessionLocal, credit_ledger.pending))
+
+    with shard.engine.begin() as conn:
+        conn.execute(update(Account).where(Account.nickname == "erin").values(credits=500))
+    changed_elsewhere("erin")
+    asyncio.run(feed.poll())
+
+    assert leaderboard.rank("erin") == (1, 500)
+
+
+def test_forked_workers_get_their_own_origin():
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.write(write, str(process_origin()).encode())
+        os._exit(0)
+    os.waitpid(pid, 0)
+    child = int(os.read(read, 64))
+    os.close(read)
+    os.close(write)
+
+    assert child != process_origin()
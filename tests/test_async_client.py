@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from client.async_client import AsyncConnection, GamePool
+from server.game.handlers import GameHandlers
+from server.game.server import GameServer
+
+
+class HangingHandlers:
+    """Never answers "hang"; echoes anything else."""
+    async def handle(self, request, session=None):
+        if request["action"] == "hang":
+            await asyncio.sleep(3600)
+        return {"status": "ok", "action": request["action"]}
+
+
+def serve(scenario, handlers=None):
+    async def run():
+        server = GameServer(handlers or GameHandlers(), host="127.0.0.1", port=0, idle_timeout=5)
+        await server.start()
+        port = server._server.sockets[0].getsockname()[1]
+        try:
+            return await scenario(port)
+        finally:
+            await server.close(grace=0.1)
+    return asyncio.run(run())
+
+
+def test_players_trade_over_shared_connections(make_account):
+    make_account("alice", 100)
+    make_account("bob", 100)
+
+    async def scenario(port):
+        async with GamePool(port=port, connections=2) as pool:
+            alice, bob = pool.player("alice"), pool.player("bob")
+            await asyncio.gather(alice.login(), bob.login())
+            credits = alice.credits
+            bought = await asyncio.gather(alice.buy("potion"), bob.buy("sword"))
+            sold = await alice.sell("potion")
+            return credits, bought, sold, alice, bob, await pool.items()
+
+    credits, bought, sold, alice, bob, items = serve(scenario)
+    assert [reply["status"] for reply in bought] == ["ok", "ok"]
+    assert sold["status"] == "ok"
+    assert (alice.credits, alice.items_owned) == (credits, [])
+    assert bob.items_owned == ["sword"]
+    assert items == {"sword": 50, "shield": 40, "potion": 10}
+
+
+def test_players_log_in_again_after_a_reconnect(make_account):
+    make_account("alice", 100)
+
+    async def scenario(port):
+        async with GamePool(port=port, connections=1) as pool:
+            alice = pool.player("alice")
+            await alice.login()
+            # The server forgets logins along with the connection.
+            await pool.connections[0].close()
+            return await alice.inventory(), pool.connections[0].generation
+
+    inventory, generation = serve(scenario)
+    assert inventory["status"] == "ok"
+    assert generation == 2
+
+
+def test_request_timeout():
+    async def scenario(port):
+        connection = AsyncConnection(port=port)
+        try:
+            with pytest.raises(asyncio.TimeoutError):
+                await connection.request({"action": "hang"}, timeout=0.2)
+            return await connection.request({"action": "ping"}, timeout=5)
+        finally:
+            await connection.close()
+
+    assert serve(scenario, HangingHandlers())["status"] == "ok"
@@ -0,0 +1,111 @@
+import asyncio
+
+import httpx
+from sqlalchemy import update
+
+from server.cache.invalidation import ACCOUNTS, publish
+from server.cache.revocation import RevocationSet
+from server.config.settings import INVALIDATION_POLL_SECONDS
+from server.config.sharding import shards
+from server.db.models.all import Account, AccountChange, AccountItem
+from server_main import app
+
+
+def with_client(scenario):
+    async def run():
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await scenario(client)
+    return asyncio.run(run())
+
+
+async def login(client, nickname: str) -> str:
+    response = await client.post("/api/v1/auth/login", params={"nickname": nickname})
+    assert response.status_code == 200
+    return response.json()["token"]
+
+
+def bearer(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_login_creates_account_and_token_authenticates():
+    async def scenario(client):
+        token = await login(client, "alice")
+        response = await client.get("/api/v1/auth/users/me", headers=bearer(token))
+        assert response.status_code == 200
+        body = response.json()
+        assert body["nickname"] == "alice"
+        assert body["items"] == []
+        assert body["credits"] >= 0
+    with_client(scenario)
+
+
+def test_logout_revokes_only_that_token():
+    async def scenario(client):
+        first = await login(client, "bob")
+        second = await login(client, "bob")
+
+        assert (await client.post("/api/v1/auth/logout", headers=bearer(first))).status_code == 200
+        assert (await client.get("/api/v1/auth/users/me", headers=bearer(first))).status_code == 401
+        assert (await client.get("/api/v1/auth/users/me", headers=bearer(second))).status_code == 200
+        # Already revoked.
+        assert (await client.post("/api/v1/auth/logout", headers=bearer(first))).status_code == 401
+    with_client(scenario)
+
+
+def test_logout_with_unknown_token_is_rejected():
+    async def scenario(client):
+        response = await client.post("/api/v1/auth/logout", headers=bearer("not-a-token"))
+        assert response.status_code == 401
+    with_client(scenario)
+
+
+def test_revocations_reach_other_workers_through_the_tokens_table():
+    async def scenario(client):
+        token = await login(client, "carol")
+        assert (await client.post("/api/v1/auth/logout", headers=bearer(token))).status_code == 200
+        return token
+    token = with_client(scenario)
+
+    # A fresh set stands in for another worker's copy.
+    other_worker = RevocationSet()
+    asyncio.run(other_worker.refresh([shard.AsyncReadSessionLocal for shard in shards]))
+    assert token in other_worker
+
+
+def test_batch_login_issues_a_token_per_nickname():
+    async def scenario(client):
+        response = await client.post("/api/v1/auth/login/batch", json={"nicknames": ["dave", "erin", "dave"]})
+        assert response.status_code == 200
+        tokens = response.json()["tokens"]
+        assert set(tokens) == {"dave", "erin"}
+        for nickname, token in tokens.items():
+            me = await client.get("/api/v1/auth/users/me", headers=bearer(token))
+            assert me.json()["nickname"] == nickname
+    with_client(scenario)
+
+
+def test_users_me_sees_trades_made_by_another_process():
+    async def scenario(client):
+        token = await login(client, "frank")
+        before = (await client.get("/api/v1/auth/users/me", headers=bearer(token))).json()
+
+        def game_server_buys_potion():
+            # Same writes as a trade, with the change row of another process.
+            with shards.for_nickname("frank").engine.begin() as conn:
+                conn.execute(update(Account).where(Account.nickname == "frank").values(credits=Account.credits - 10))
+                conn.execute(AccountItem.__table__.insert().values(nickname="frank", item_key="potion"))
+                conn.execute(AccountChange.__table__.insert().values(nickname="frank", origin=0))
+                publish(conn, ACCOUNTS)
+        await asyncio.to_thread(game_server_buys_potion)
+
+        for _ in range(40):
+            await asyncio.sleep(INVALIDATION_POLL_SECONDS / 4)
+            after = (await client.get("/api/v1/auth/users/me", headers=bearer(token))).json()
+            if after["items"]:
+                break
+        assert [item["item_key"] for item in after["items"]] == ["potion"]
+        assert after["credits"] == before["credits"] - 10
+    with_client(scenario)
@@ -0,0 +1,55 @@
+import asyncio
+
+import httpx
+
+from server.config.sharding import shards
+from server.db.models.all import ItemMaster
+from server_main import app
+
+
+def get_items(*etags: str) -> list[httpx.Response]:
+    """GETs the catalog once per If-None-Match value ("" sends none)."""
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return [
+                await client.get("/api/v1/items", headers={"If-None-Match": etag} if etag else {})
+                for etag in etags
+            ]
+    return asyncio.run(run())
+
+
+def set_price(item_key: str, price: int):
+    session = shards.catalog.SessionLocal()
+    try:
+        session.get(ItemMaster, item_key).price = price
+        session.commit()
+    finally:
+        session.close()
+
+
+def test_catalog_is_revalidated_by_etag():
+    [first] = get_items("")
+    etag = first.headers["ETag"]
+    assert first.status_code == 200
+    assert first.json()["sword"] == {"name": "Sword", "price": 50}
+
+    same, weak, listed, other = get_items(etag, "W/" + etag, f'"stale", {etag}', '"stale"')
+
+    assert [response.status_code for response in (same, weak, listed, other)] == [304, 304, 304, 200]
+    assert same.content == b""
+    assert same.headers["ETag"] == etag
+    assert other.content == first.content
+
+
+def test_catalog_changes_get_a_new_etag():
+    [before] = get_items("")
+    set_price("potion", 12)
+    try:
+        [after] = get_items(before.headers["ETag"])
+    finally:
+        set_price("potion", 10)
+
+    assert after.status_code == 200
+    assert after.headers["ETag"] != before.headers["ETag"]
+    assert after.json()["potion"]["price"] == 12
@@ -0,0 +1,67 @@
+import asyncio
+import logging
+import time
+
+import httpx
+from fastapi import FastAPI, HTTPException
+
+from server.config.middlewares import UnhandledErrorMiddleware
+from server.utils.exception_handlers import register_exception_handlers
+from server.utils.logger import RateLimitedLogger
+
+
+def error_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(UnhandledErrorMiddleware)
+    register_exception_handlers(app)
+
+    @app.get("/unauthorized")
+    async def unauthorized():
+        raise HTTPException(401, "Could not validate credentials", headers={"WWW-Authenticate": "Bearer"})
+
+    @app.get("/invalid")
+    async def invalid():
+        raise ValueError("Nickname is too long")
+
+    @app.get("/crash")
+    async def crash():
+        raise RuntimeError("bug")
+
+    return app
+
+
+def get(*paths: str) -> list[httpx.Response]:
+    async def run():
+        transport = httpx.ASGITransport(app=error_app(), raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return [await client.get(path) for path in paths]
+    return asyncio.run(run())
+
+
+def test_errors_keep_the_error_body_shape():
+    unauthorized, invalid, missing, crash = get("/unauthorized", "/invalid", "/missing", "/crash")
+
+    assert unauthorized.status_code == 401
+    assert unauthorized.json() == {"error": {"message": "Could not validate credentials", "code": 401}}
+    assert unauthorized.headers["WWW-Authenticate"] == "Bearer"
+    assert invalid.status_code == 400
+    assert invalid.json() == {"error": {"message": "Nickname is too long", "code": 400}}
+    assert missing.json() == {"error": {"message": "Not Found", "code": 404}}
+    assert crash.status_code == 500
+    assert crash.json() == {"error": {"message": "Internal Server Error", "code": 500, "details": None}}
+
+
+def test_repeated_errors_are_logged_once_per_burst(caplog):
+    logger = RateLimitedLogger(logging.getLogger("test.errors"), interval=0.05, burst=2)
+    with caplog.at_level(logging.WARNING, logger="test.errors"):
+        for attempt in range(5):
+            logger.warning("login", "Failed login %d", attempt)
+        time.sleep(0.06)
+        logger.warning("login", "Failed login %d", 5)
+
+    assert [record.getMessage() for record in caplog.records] == [
+        "Failed login 0",
+        "Failed login 1",
+        "Suppressed 3 similar messages for 'login' in the last 0s",
+        "Failed login 5",
+    ]
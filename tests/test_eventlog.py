@@ -0,0 +1,40 @@
+import hashlib
+
+from server.db.eventlog import BONUS, BUY, RECORD, SELL, EventLog, account_digest, iter_events, replay_balances, \
+    segments
+
+
+def test_item_keys_round_trip_or_are_digested_whole(tmp_path):
+    long_key = "зелье-невидимости"  # 33 bytes; cutting at 16 splits a character
+    log = EventLog(str(tmp_path), commit_interval=60, segment_records=100)
+    log.start()
+    log.append(BUY, "alice", -10, "potion")
+    log.append(BUY, "alice", -10, long_key)
+    log.append(SELL, "alice", 10, "exactly16bytes!!")
+    log.close()
+
+    events = list(iter_events(str(tmp_path)))
+
+    digest = hashlib.blake2b(long_key.encode("utf-8"), digest_size=15).hexdigest()
+    assert [event.item_key for event in events] == ["potion", "#" + digest, "exactly16bytes!!"]
+    assert [event.delta for event in events] == [-10, -10, 10]
+
+
+def test_replay_stops_at_the_first_corrupt_record(tmp_path):
+    log = EventLog(str(tmp_path), commit_interval=60, segment_records=20000)
+    log.start()
+    for _ in range(10000):
+        log.append(BONUS, "alice", 1)
+    log.close()
+    assert replay_balances(str(tmp_path)) == {account_digest("alice"): 10000}
+
+    [path] = segments(str(tmp_path))
+    with open(path, "r+b") as f:
+        # One flipped bit in the delta of record 5000, inside the second checked run.
+        f.seek(5000 * RECORD.size + 20)
+        byte = f.read(1)
+        f.seek(-1, 1)
+        f.write(bytes([byte[0] ^ 1]))
+
+    assert replay_balances(str(tmp_path)) == {account_digest("alice"): 5000}
+    assert len(list(iter_events(str(tmp_path)))) == 5000
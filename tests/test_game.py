@@ -0,0 +1,119 @@
+import asyncio
+
+from sqlalchemy import delete
+
+from server.cache.accounts import account_cache
+from server.cache.catalog import catalog
+from server.config.sharding import shards
+from server.db.models.all import ItemMaster
+from server.game.handlers import GameHandlers, GameSession
+
+
+def play(*steps):
+    """Runs (session, request) pairs in order through one GameHandlers; returns the replies."""
+    async def run():
+        handlers = GameHandlers()
+        return [await handlers.handle(request, session) for session, request in steps]
+    return asyncio.run(run())
+
+
+def test_actions_require_login_on_the_same_connection(make_account):
+    make_account("alice", 100)
+    mine, other = GameSession(), GameSession()
+
+    login, stolen, bought, logout, after_logout = play(
+        (mine, {"action": "login", "nickname": "alice"}),
+        (other, {"action": "buy", "nickname": "alice", "item": "potion"}),
+        (mine, {"action": "buy", "nickname": "alice", "item": "potion"}),
+        (mine, {"action": "logout", "nickname": "alice"}),
+        (mine, {"action": "sell", "nickname": "alice", "item": "potion"}),
+    )
+
+    assert login["status"] == "ok"
+    assert stolen["status"] == "error"
+    assert bought["status"] == "ok"
+    assert logout["status"] == "ok"
+    assert after_logout["status"] == "error"
+
+
+def test_items_owned_reflects_trades_from_other_connections(make_account):
+    make_account("bob", 200)
+    first, second = GameSession(), GameSession()
+
+    replies = play(
+        (first, {"action": "login", "nickname": "bob"}),
+        (second, {"action": "login", "nickname": "bob"}),
+        (first, {"action": "buy", "nickname": "bob", "item": "potion"}),
+        (second, {"action": "buy", "nickname": "bob", "item": "sword"}),
+        (first, {"action": "sell", "nickname": "bob", "item": "potion"}),
+    )
+
+    assert sorted(replies[3]["items_owned"]) == ["potion", "sword"]
+    assert replies[4]["items_owned"] == ["sword"]
+    assert replies[4]["credits"] == replies[1]["credits"] - 50
+
+
+def test_inventory_lists_catalog_items_missing_from_the_players_shard(make_account):
+    nickname = next(f"archer-{index}" for index in range(100) if shards.for_nickname(f"archer-{index}") is not shards.catalog)
+    make_account(nickname, 100)
+    # New catalog items are only added to shard 0.
+    with shards.catalog.engine.begin() as conn:
+        conn.execute(ItemMaster.__table__.insert().values(item_key="bow", name="Bow", price=30))
+    catalog.invalidate()
+    session = GameSession()
+    try:
+        bought, inventory = play(
+            (session, {"action": "login", "nickname": nickname}),
+            (session, {"action": "buy", "nickname": nickname, "item": "bow"}),
+            (session, {"action": "inventory", "nickname": nickname}),
+        )[1:]
+        account_cache.clear()
+        (uncached,) = play((session, {"action": "inventory", "nickname": nickname}))
+    finally:
+        with shards.catalog.engine.begin() as conn:
+            conn.execute(delete(ItemMaster.__table__).where(ItemMaster.item_key == "bow"))
+
+    assert bought["items_owned"] == ["bow"]
+    assert inventory["items_owned"] == ["bow"]
+    assert uncached["items_owned"] == ["bow"]
+
+
+def test_only_protocol_actions_are_dispatched():
+    session = GameSession()
+    replies = play(*[(session, {"action": action}) for action in ("run", "account_payload", "require", None)])
+
+    assert [reply["status"] for reply in replies] == ["error"] * 4
+    assert all(reply["error"].startswith("Unknown action") for reply in replies)
+
+
+def test_unexpected_errors_become_error_replies(make_account, monkeypatch):
+    make_account("gina", 100)
+    session = GameSession()
+
+    def broken(self, request):
+        raise RuntimeError("pool timeout")
+
+    monkeypatch.setitem(GameHandlers.ACTIONS, "buy", broken)
+    login, bought = play(
+        (session, {"action": "login", "nickname": "gina"}),
+        (session, {"action": "buy", "nickname": "gina", "item": "potion"}),
+    )
+
+    assert login["status"] == "ok"
+    assert bought == {"status": "error", "error": "Internal error"}
+
+def test_logins_and_lookups_of_existing_accounts_do_not_take_the_write_lock(make_account, monkeypatch):
+    shard = make_account("hank", 100)
+    session = GameSession()
+
+    def no_writes():
+        raise AssertionError("write session opened")
+
+    monkeypatch.setattr(shard, "SessionLocal", no_writes)
+    login, inventory = play(
+        (session, {"action": "login", "nickname": "hank"}),
+        (session, {"action": "inventory", "nickname": "hank"}),
+    )
+
+    assert login["status"] == "ok"
+    assert inventory["credits"] == login["credits"]
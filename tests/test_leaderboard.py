@@ -0,0 +1,85 @@
+import asyncio
+
+import httpx
+
+from server.cache.leaderboard import Leaderboard
+from server.config.sharding import shards
+from server.db.ledger import credit_ledger
+from server_main import app
+
+
+def with_client(scenario):
+    async def run():
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await scenario(client)
+    return asyncio.run(run())
+
+
+def loaded_board(**credits) -> Leaderboard:
+    board = Leaderboard()
+    board.loaded = True
+    for nickname, balance in credits.items():
+        board.set(nickname, balance)
+    return board
+
+
+def test_ranks_follow_credit_changes_with_ties_by_nickname():
+    board = loaded_board(alice=50, bob=50, carol=10)
+    assert board.top(3) == [(1, "alice", 50), (2, "bob", 50), (3, "carol", 10)]
+
+    board.add("carol", 45)
+    board.add("dave", 100)  # unknown until the next rebuild
+
+    assert board.top(2) == [(1, "carol", 55), (2, "alice", 50)]
+    assert board.rank("bob") == (3, 50)
+    assert board.rank("dave") is None
+
+
+def test_rebuild_counts_pending_credits_and_changes_made_while_reading(make_account):
+    for nickname, credits in (("alice", 10), ("bob", 20)):
+        make_account(nickname, credits)
+    board = loaded_board()
+
+    class ChangingSession:
+        """Reads like a shard session, but bob's balance changes mid-read."""
+        def __init__(self, session_factory):
+            self.session = session_factory()
+
+        def execute(self, statement):
+            rows = self.session.execute(statement).all()
+            board.set("bob", 99)
+            return rows
+
+        def close(self):
+            self.session.close()
+
+    factories = [lambda shard=shard: ChangingSession(shard.ReadSessionLocal) for shard in shards]
+    pending = {"alice": 15}
+    assert board.rebuild(factories, pending=lambda nickname: pending.get(nickname, 0)) == 2
+    assert board.top(2) == [(1, "bob", 99), (2, "alice", 25)]
+
+
+def test_leaderboard_endpoints(make_account):
+    for nickname, credits in (("alice", 30), ("bob", 80), ("carol", 50)):
+        make_account(nickname, credits)
+
+    async def scenario(client):
+        credit_ledger.add("alice", 100)
+        return (
+            await client.get("/api/v1/leaderboard", params={"limit": 2}),
+            await client.get("/api/v1/leaderboard/carol"),
+            await client.get("/api/v1/leaderboard/nobody"),
+            await client.get("/api/v1/leaderboard", params={"limit": 0}),
+        )
+
+    top, carol, nobody, invalid = with_client(scenario)
+
+    assert top.json() == {"leaders": [
+        {"rank": 1, "nickname": "alice", "credits": 130},
+        {"rank": 2, "nickname": "bob", "credits": 80},
+    ]}
+    assert carol.json() == {"rank": 3, "nickname": "carol", "credits": 50}
+    assert nobody.status_code == 404
+    assert invalid.status_code == 422
@@ -0,0 +1,64 @@
+import pytest
+from sqlalchemy import create_engine, select
+
+from server.config.sharding import shards
+from server.db.ledger import CreditLedger
+from server.db.models.all import Account
+
+
+def stored_credits(nickname: str) -> int:
+    with shards.for_nickname(nickname).read_engine.connect() as conn:
+        return conn.scalar(select(Account.credits).where(Account.nickname == nickname))
+
+
+def ledger(bind_for=lambda nickname: shards.for_nickname(nickname).engine) -> CreditLedger:
+    return CreditLedger(bind_for, flush_interval=60, max_pending=1000)
+
+
+def test_deltas_are_coalesced_and_written_on_flush(make_account):
+    make_account("alice", 10)
+    make_account("bob", 10)
+    credits = ledger()
+
+    credits.add("alice", 5)
+    credits.add("alice", 7)
+    credits.add("bob", -3)
+    assert stored_credits("alice") == 10
+    assert credits.pending("alice") == 12
+
+    assert credits.flush() == 2
+    assert (stored_credits("alice"), stored_credits("bob")) == (22, 7)
+    assert credits.pending("alice") == 0
+    assert credits.flush() == 0
+
+
+def test_a_failed_database_keeps_its_deltas_for_the_next_flush(make_account, tmp_path):
+    make_account("alice", 10)
+    make_account("bob", 10)
+    broken = create_engine(f"sqlite:///{tmp_path}/missing/game.db")
+    bind = {"bob": broken}
+    credits = ledger(lambda nickname: bind.get(nickname) or shards.for_nickname(nickname).engine)
+    credits.add("alice", 5)
+    credits.add("bob", 5)
+
+    with pytest.raises(Exception):
+        credits.flush()
+    assert stored_credits("alice") == 15
+    assert (credits.pending("alice"), credits.pending("bob")) == (0, 5)
+
+    bind.clear()
+    assert credits.flush() == 1
+    assert stored_credits("bob") == 15
+
+
+def test_balances_read_across_a_flush_are_not_settled(make_account):
+    make_account("alice", 10)
+    credits = ledger()
+    credits.add("alice", 5)
+
+    epoch = credits.epoch
+    assert credits.settled_balance("alice", 10, epoch) == 15
+    credits.flush()
+    # The stored 10 was read before the flush: it may or may not include the 5.
+    assert credits.settled_balance("alice", 10, epoch) is None
+    assert credits.settled_balance("alice", 15, credits.epoch) == 15
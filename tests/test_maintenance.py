@@ -0,0 +1,57 @@
+import asyncio
+import sqlite3
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from server.config.sharding import shards
+from server.db.maintenance import TokenSweeper
+from server.db.models.all import Token
+from server.utils.metrics import tokens_rows
+
+SHARD = shards[0]
+
+
+def add_tokens(count: int, expires_at: datetime, prefix: str):
+    with SHARD.engine.begin() as conn:
+        conn.execute(Token.__table__.insert(), [
+            {"token": f"{prefix}-{index}", "account_nickname": "alice", "expires_at": expires_at}
+            for index in range(count)
+        ])
+
+
+def test_sweep_deletes_only_expired_tokens_in_batches(make_account):
+    make_account("alice", 10)
+    add_tokens(5, datetime.utcnow() - timedelta(minutes=1), "expired")
+    add_tokens(2, datetime.utcnow() + timedelta(hours=1), "live")
+
+    assert asyncio.run(TokenSweeper(SHARD.AsyncSessionLocal, batch_size=2, pause=0).sweep()) == 5
+
+    with SHARD.read_engine.connect() as conn:
+        assert set(conn.scalars(select(Token.token))) == {"live-0", "live-1"}
+    assert "tokens_rows 2" in tokens_rows.render()
+
+
+def test_cancelling_the_sweeper_mid_batch_releases_the_write_lock():
+    sweeper = TokenSweeper(SHARD.AsyncSessionLocal, batch_size=1000, pause=0)
+
+    def take_write_lock():
+        conn = sqlite3.connect(SHARD.db_file, timeout=1, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("ROLLBACK")
+        finally:
+            conn.close()
+
+    async def sweep_and_cancel(delay: float):
+        add_tokens(3000, datetime.utcnow() - timedelta(minutes=1), f"expired-{delay}")
+        task = asyncio.create_task(sweeper.run(interval=60))
+        await asyncio.sleep(delay)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        # Times out if a cancelled batch left its transaction open on a dropped connection.
+        await asyncio.to_thread(take_write_lock)
+
+    # Cancel at different points of the first batches.
+    for step in range(40):
+        asyncio.run(sweep_and_cancel(step * 0.0005))
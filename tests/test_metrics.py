@@ -0,0 +1,99 @@
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine, text
+
+from server.config import middlewares
+from server.config.middlewares import MetricsMiddleware
+from server.utils.metrics import Histogram, db_statements_per_request, http_requests_total, instrument_engine
+from server.utils.profiler import SamplingProfiler
+
+
+def spin(seconds: float):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def metrics_app(profiler=None) -> MetricsMiddleware:
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    app = FastAPI()
+
+    @app.get("/things/{thing_id}")
+    def get_thing(thing_id: int):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+        return {"id": thing_id}
+
+    @app.get("/spin")
+    async def get_spin():
+        spin(0.05)
+        return {}
+
+    app = MetricsMiddleware(app)
+    app.profiler = profiler
+    return app
+
+
+def get(app, *paths: str) -> list[httpx.Response]:
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return [await client.get(path) for path in paths]
+    return asyncio.run(run())
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("latency_seconds", "Test latency.", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        histogram.observe(value, route="/a")
+
+    assert histogram.render()[2:] == [
+        'latency_seconds_bucket{route="/a",le="0.1"} 1',
+        'latency_seconds_bucket{route="/a",le="1.0"} 3',
+        'latency_seconds_bucket{route="/a",le="+Inf"} 4',
+        'latency_seconds_sum{route="/a"} 6.05',
+        'latency_seconds_count{route="/a"} 4',
+    ]
+
+
+def test_requests_are_counted_per_route_template_with_their_sql_statements():
+    responses = get(metrics_app(), "/things/1", "/things/2", "/missing")
+    assert [response.status_code for response in responses] == [200, 200, 404]
+
+    assert 'http_requests_total{method="GET",route="/things/{thing_id}",status="200"} 2' in http_requests_total.render()
+    assert 'http_requests_total{method="GET",route="unmatched",status="404"} 1' in http_requests_total.render()
+    assert 'db_statements_per_request_sum{route="/things/{thing_id}"} 4.0' in db_statements_per_request.render()
+
+
+def test_slow_requests_get_a_profile_dump(monkeypatch, tmp_path):
+    monkeypatch.setattr(middlewares, "SLOW_REQUEST_SECONDS", 0.02)
+    monkeypatch.setattr(middlewares, "PROFILE_DUMP_DIR", str(tmp_path))
+    profiler = SamplingProfiler(0.001)
+    try:
+        get(metrics_app(profiler), "/spin", "/things/1")
+    finally:
+        profiler.stop()
+
+    [dump] = tmp_path.iterdir()
+    assert dump.name.endswith("-GET-spin.folded")
+    assert "spin (test_metrics.py:" in dump.read_text()
+
+
+def test_profiler_dumps_only_the_requested_window(tmp_path):
+    profiler = SamplingProfiler(0.001)
+    profiler.start()
+    try:
+        started = time.perf_counter()
+        spin(0.05)
+        finished = time.perf_counter()
+    finally:
+        profiler.stop()
+
+    assert profiler.dump(str(tmp_path / "window.folded"), started, finished) > 0
+    assert profiler.dump(str(tmp_path / "later.folded"), finished + 1, finished + 2) == 0
+    assert not (tmp_path / "later.folded").exists()
@@ -0,0 +1,100 @@
+import asyncio
+import socket
+
+from client.protocol import FramedConnection
+from server.game.server import GameServer
+
+
+class StubHandlers:
+    """Echoes the action; "slow" takes a moment and "boom" raises."""
+    async def handle(self, request, session=None):
+        if request["action"] == "slow":
+            await asyncio.sleep(0.2)
+        if request["action"] == "boom":
+            raise RuntimeError("handler bug")
+        return {"status": "ok", "action": request["action"]}
+
+
+def serve(scenario, **options):
+    async def run():
+        server = GameServer(StubHandlers(), host="127.0.0.1", port=0, idle_timeout=5, **options)
+        await server.start()
+        port = server._server.sockets[0].getsockname()[1]
+        try:
+            return await scenario(port)
+        finally:
+            await server.close(grace=0.1)
+    return asyncio.run(run())
+
+
+def blocking(client, **options):
+    """Runs client(sock) against a server in a thread, as the console client does."""
+    def connect(port):
+        with socket.create_connection(("127.0.0.1", port)) as sock:
+            return client(sock)
+
+    async def scenario(port):
+        return await asyncio.to_thread(connect, port)
+    return serve(scenario, **options)
+
+
+def test_framed_replies_are_matched_by_id():
+    def client(sock):
+        connection = FramedConnection(sock)
+        codec = connection.handshake()
+        return codec, connection.pipeline([{"action": "slow"}, {"action": "fast"}])
+
+    codec, (slow, fast) = blocking(client)
+    assert codec is not None
+    assert slow == {"status": "ok", "action": "slow", "id": 1}
+    assert fast == {"status": "ok", "action": "fast", "id": 2}
+
+
+def test_codec_negotiation_falls_back_to_json():
+    def client(sock):
+        connection = FramedConnection(sock, encodings=["cbor", "json"])
+        return connection.handshake().name, connection.request({"action": "ping"})
+
+    assert blocking(client) == ("json", {"status": "ok", "action": "ping", "id": 1})
+
+
+def test_framed_requests_are_served_concurrently_up_to_max_inflight():
+    def client(sock):
+        connection = FramedConnection(sock)
+        connection.handshake()
+        connection.send({"action": "slow"})
+        connection.send({"action": "fast"})
+        return [connection._read_frame()["action"] for _ in range(2)]
+
+    assert blocking(client) == ["fast", "slow"]
+    # With one request in flight the server stops reading until "slow" is answered.
+    assert blocking(client, max_inflight=1) == ["slow", "fast"]
+
+
+def test_line_mode_without_handshake():
+    def client(sock):
+        connection = FramedConnection(sock)
+        return connection.pipeline([{"action": "slow"}, {"action": "fast"}, {"action": "quit"}])
+
+    slow, fast, bye = blocking(client)
+    assert (slow["action"], fast["action"], bye["message"]) == ("slow", "fast", "Bye")
+
+
+def test_a_failing_handler_still_answers_its_frame():
+    def client(sock):
+        connection = FramedConnection(sock)
+        connection.handshake()
+        return connection.pipeline([{"action": "boom"}, {"action": "ping"}])
+
+    failed, answered = blocking(client)
+    assert failed == {"status": "error", "error": "Internal error", "id": 1}
+    assert answered == {"status": "ok", "action": "ping", "id": 2}
+
+
+def test_blocking_client_gets_error_frames_without_an_id():
+    def client(sock):
+        connection = FramedConnection(sock)
+        connection.handshake()
+        return connection.request({"action": "ping", "padding": "x" * 4096})
+
+    assert blocking(client, max_request_bytes=1024) == {"status": "error", "error": "Request too large"}
@@ -0,0 +1,58 @@
+import asyncio
+import json
+
+import httpx
+
+from server.config.middlewares import RateLimitMiddleware
+from server.utils.rate_limit import RateLimiter
+
+
+async def echo_app(scope, receive, send):
+    """Answers 200 with the request body it received."""
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            break
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": body})
+
+
+def run(*requests):
+    """Sends (path, json body) pairs through one throttled app; returns the responses."""
+    middleware = RateLimitMiddleware(echo_app)
+    middleware.limiter = RateLimiter(rate=0.001, burst=3, global_rate=1000, global_burst=1000, max_clients=10)
+    middleware.batch_limiter = RateLimiter(rate=0.001, burst=10, global_rate=1000, global_burst=1000, max_clients=10)
+
+    async def send_all():
+        transport = httpx.ASGITransport(app=middleware)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return [await client.post(path, json=body) for path, body in requests]
+    return asyncio.run(send_all())
+
+
+def batch(count: int) -> tuple:
+    return "/api/v1/auth/login/batch", {"nicknames": [f"bot-{index}" for index in range(count)]}
+
+
+def test_batch_login_is_charged_per_nickname():
+    first, second, small = run(batch(8), batch(8), batch(2))
+
+    assert first.status_code == 200
+    assert json.loads(first.content) == batch(8)[1]
+    assert second.status_code == 429
+    assert int(second.headers["Retry-After"]) >= 1
+    assert small.status_code == 200
+
+
+def test_batch_login_does_not_share_the_single_login_bucket():
+    responses = run(batch(1), batch(1), batch(1), batch(1), *[("/api/v1/auth/login", None)] * 4)
+
+    assert [response.status_code for response in responses] == [200] * 4 + [200, 200, 200, 429]
+
+
+def test_other_paths_are_not_throttled():
+    responses = run(*[("/api/v1/auth/logout", None)] * 5)
+
+    assert {response.status_code for response in responses} == {200}
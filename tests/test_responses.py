@@ -0,0 +1,24 @@
+import json
+
+import pytest
+
+from server.api.schemas.account import InventoryItemPayload, InventoryPayload, TokenPayload
+from server.utils import response_handlers
+from server.utils.response_handlers import FastJSONResponse, dumps
+
+INVENTORY = InventoryPayload("сергей", 15, [InventoryItemPayload("sword", "Sword", 50)])
+EXPECTED = '{"nickname":"сергей","credits":15,"items":[{"item_key":"sword","name":"Sword","price":50}]}'
+
+
+def test_slotted_payloads_serialize_like_dicts():
+    assert dumps(INVENTORY).decode("utf-8") == EXPECTED
+    assert json.loads(FastJSONResponse(TokenPayload("abc")).body) == {"token": "abc", "token_type": "bearer"}
+
+
+def test_stdlib_fallback_produces_the_same_bytes(monkeypatch):
+    expected = dumps(INVENTORY)
+    monkeypatch.setattr(response_handlers, "orjson", None)
+
+    assert dumps(INVENTORY) == expected
+    with pytest.raises(TypeError):
+        dumps({"unsupported": object()})
@@ -0,0 +1,42 @@
+from sqlalchemy import func, select
+
+from server.config.sharding import ShardRouter, shard_index, shards
+from server.db.models.all import Account, AccountItem
+from server.db.rebalance import rebalance
+
+NICKNAMES = [f"player-{index}" for index in range(40)]
+
+
+def accounts_on(shard) -> set:
+    with shard.read_engine.connect() as conn:
+        return set(conn.scalars(select(Account.nickname)))
+
+
+def test_shard_index_is_stable_and_spreads_nicknames():
+    assert [shard_index(nickname, 2) for nickname in NICKNAMES] == [shard_index(nickname, 2) for nickname in NICKNAMES]
+    assert {shard_index(nickname, 2) for nickname in NICKNAMES} == {0, 1}
+    assert shards.for_nickname("anyone") in list(shards)
+
+
+def test_accounts_live_only_on_their_shard(make_account):
+    for nickname in NICKNAMES:
+        make_account(nickname, 10)
+
+    for shard in shards:
+        assert accounts_on(shard) == {nickname for nickname in NICKNAMES if shard_index(nickname, 2) == shard.index}
+
+
+def test_rebalance_moves_accounts_with_items_and_back(make_account):
+    for nickname in NICKNAMES:
+        make_account(nickname, 10, items=["potion"])
+
+    rebalance(2, 3)
+    three = ShardRouter(3)
+    for shard in three:
+        assert accounts_on(shard) == {nickname for nickname in NICKNAMES if shard_index(nickname, 3) == shard.index}
+        with shard.read_engine.connect() as conn:
+            assert conn.scalar(select(func.count()).select_from(AccountItem)) == len(accounts_on(shard))
+
+    rebalance(3, 2)
+    assert accounts_on(three[2]) == set()
+    assert set().union(*(accounts_on(shard) for shard in shards)) == set(NICKNAMES)
@@ -0,0 +1,52 @@
+import asyncio
+
+from sqlalchemy import select
+
+from server.cache.catalog import catalog
+from server.cache.leaderboard import leaderboard
+from server.config.sharding import shards
+from server.db.ledger import credit_ledger
+from server.db.models.all import Account
+from server.utils.metrics import startup_seconds
+from server_main import app, lifespan
+
+
+def opened(pool) -> int:
+    return pool.checkedin() + pool.checkedout()
+
+
+def test_lifespan_warms_caches_and_pools_before_serving(make_account):
+    make_account("alice", 70)
+
+    async def started():
+        async with lifespan(app):
+            return (
+                catalog.peek() is not None,
+                leaderboard.rank("alice"),
+                [opened(shard.read_engine.pool) for shard in shards],
+                [opened(shard.async_read_engine.pool) for shard in shards],
+            )
+
+    catalog_loaded, rank, sync_pooled, async_pooled = asyncio.run(started())
+
+    assert catalog_loaded
+    assert rank == (1, 70)
+    assert sync_pooled == [shard.read_engine.pool.size() for shard in shards]
+    assert async_pooled == [shard.async_read_engine.pool.size() for shard in shards]
+    rendered = "\n".join(startup_seconds.render())
+    for phase in ("schema", "connections", "catalog", "jwt", "leaderboard", "total"):
+        assert f'phase="{phase}"' in rendered
+
+
+def test_shutdown_flushes_pending_credits(make_account):
+    shard = make_account("alice", 70)
+
+    async def add_credits():
+        async with lifespan(app):
+            credit_ledger.add("alice", 5)
+
+    asyncio.run(add_credits())
+
+    assert credit_ledger.pending("alice") == 0
+    with shard.read_engine.connect() as conn:
+        assert conn.scalar(select(Account.credits).where(Account.nickname == "alice")) == 75
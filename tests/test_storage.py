@@ -0,0 +1,68 @@
+import asyncio
+import sqlite3
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from server.config.settings import create_engines
+
+
+@pytest.fixture
+def engines(tmp_path):
+    db_file = str(tmp_path / "storage.db")
+    engines = create_engines(db_file)
+    write, read, async_write, async_read = engines
+    with write.begin() as conn:
+        conn.execute(text("CREATE TABLE balances (nickname TEXT PRIMARY KEY, credits INTEGER)"))
+        conn.execute(text("INSERT INTO balances VALUES ('alice', 10)"))
+    yield db_file, engines
+    write.dispose()
+    read.dispose()
+
+    async def dispose():
+        await async_write.dispose()
+        await async_read.dispose()
+    asyncio.run(dispose())
+
+
+def pragma(engine, name: str):
+    with engine.connect() as conn:
+        return conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+
+def test_engines_use_the_wal_profile_and_readers_are_query_only(engines):
+    db_file, (write, read, async_write, async_read) = engines
+
+    assert pragma(write, "journal_mode") == "wal"
+    assert pragma(write, "synchronous") == 1  # NORMAL
+    assert pragma(write, "busy_timeout") == 5000
+    assert pragma(read, "query_only") == 1
+    with pytest.raises(OperationalError):
+        with read.begin() as conn:
+            conn.execute(text("UPDATE balances SET credits = 0"))
+
+    async def async_query_only():
+        async with async_read.connect() as conn:
+            return (await conn.exec_driver_sql("PRAGMA query_only")).scalar()
+    assert asyncio.run(async_query_only()) == 1
+
+
+def test_writers_take_the_lock_at_begin_and_readers_keep_their_snapshot(engines):
+    db_file, (write, read, _, _) = engines
+    other = sqlite3.connect(db_file, timeout=0, isolation_level=None)
+    try:
+        with write.begin():
+            with pytest.raises(sqlite3.OperationalError, match="locked"):
+                other.execute("BEGIN IMMEDIATE")
+
+        with read.connect() as conn:
+            with conn.begin():
+                before = conn.execute(text("SELECT credits FROM balances")).scalar()
+                other.execute("UPDATE balances SET credits = 20")
+                during = conn.execute(text("SELECT credits FROM balances")).scalar()
+            after = conn.execute(text("SELECT credits FROM balances")).scalar()
+    finally:
+        other.close()
+
+    assert (before, during, after) == (10, 10, 20)
@@ -0,0 +1,126 @@
+import threading
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from server.config.sharding import shards
+from server.db.ledger import credit_ledger
+from server.db.managers.trade_manager import TradeManager
+from server.db.models.all import Account, AccountItem
+
+
+def trade(action: str, nickname: str, item_key: str):
+    db = shards.for_nickname(nickname).SessionLocal()
+    try:
+        return getattr(TradeManager(db, shards.catalog.ReadSessionLocal), action)(nickname, item_key)
+    finally:
+        db.close()
+
+
+def stored(nickname: str) -> tuple[int, set]:
+    with shards.for_nickname(nickname).read_engine.connect() as conn:
+        credits = conn.scalar(select(Account.credits).where(Account.nickname == nickname))
+        owned = set(conn.scalars(select(AccountItem.item_key).where(AccountItem.nickname == nickname)))
+    return credits, owned
+
+
+def run_concurrently(*calls):
+    """Runs the calls in threads released together; returns results or raised exceptions."""
+    barrier = threading.Barrier(len(calls))
+    results = [None] * len(calls)
+
+    def worker(index, call):
+        barrier.wait()
+        try:
+            results[index] = call()
+        except Exception as exc:
+            results[index] = exc
+
+    threads = [threading.Thread(target=worker, args=(index, call)) for index, call in enumerate(calls)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_buy_and_sell_update_balance_and_ownership(make_account):
+    make_account("alice", 100)
+
+    bought = trade("buy", "alice", "sword")
+    assert bought.credits == 50
+    assert stored("alice") == (50, {"sword"})
+
+    sold = trade("sell", "alice", "sword")
+    assert sold.credits == 100
+    assert stored("alice") == (100, set())
+
+
+def test_concurrent_buys_cannot_overspend(make_account):
+    # Enough for the sword or the shield, not both.
+    make_account("bob", 60)
+
+    results = run_concurrently(lambda: trade("buy", "bob", "sword"), lambda: trade("buy", "bob", "shield"))
+
+    failures = [result for result in results if isinstance(result, HTTPException)]
+    assert len(failures) == 1
+    assert failures[0].detail == "Not enough credits"
+    credits, owned = stored("bob")
+    assert len(owned) == 1
+    assert credits == 60 - {"sword": 50, "shield": 40}[owned.pop()]
+
+
+def test_concurrent_buys_of_one_item_charge_once(make_account):
+    make_account("carol", 500)
+
+    results = run_concurrently(*[lambda: trade("buy", "carol", "potion")] * 4)
+
+    assert sum(not isinstance(result, Exception) for result in results) == 1
+    assert stored("carol") == (490, {"potion"})
+
+
+def test_sell_not_owned_is_rejected(make_account):
+    make_account("dave", 30)
+
+    with pytest.raises(HTTPException) as error:
+        trade("sell", "dave", "sword")
+
+    assert error.value.status_code == 400
+    assert stored("dave") == (30, set())
+
+
+def test_concurrent_sells_pay_once(make_account):
+    make_account("erin", 0, items=["sword"])
+
+    results = run_concurrently(*[lambda: trade("sell", "erin", "sword")] * 4)
+
+    assert sum(not isinstance(result, Exception) for result in results) == 1
+    assert stored("erin") == (50, set())
+
+
+def test_buy_counts_credits_pending_in_the_ledger(make_account):
+    make_account("frank", 0)
+    credit_ledger.add("frank", 50)
+
+    bought = trade("buy", "frank", "sword")
+    assert bought.credits == 0
+
+    # Spent down to zero including the pending bonus: nothing else is affordable.
+    with pytest.raises(HTTPException, match="Not enough credits"):
+        trade("buy", "frank", "potion")
+
+    credit_ledger.flush()
+    assert stored("frank") == (0, {"sword"})
+
+
+def test_buy_unknown_item_or_account(make_account):
+    make_account("gina", 100)
+
+    with pytest.raises(HTTPException) as error:
+        trade("buy", "gina", "dragon")
+    assert error.value.status_code == 404
+
+    with pytest.raises(HTTPException):
+        trade("buy", "nobody", "potion")
+    assert stored("nobody") == (None, set())
@@ -0,0 +1,33 @@
+import io
+import json
+
+from server.db.transfer import export_accounts, import_accounts
+
+
+def test_import_export_round_trip():
+    snapshot = {
+        "alice": {"credits": 806, "items": ["potion", "sword"]},
+        "bob": {"credits": 0, "items": []},
+        "сергей": {"credits": 15, "items": ["shield"]},
+    }
+    for index in range(30):
+        snapshot[f"bot-{index}"] = {"credits": index, "items": ["potion"] if index % 2 else []}
+
+    stats = import_accounts(io.StringIO(json.dumps(snapshot, ensure_ascii=False)), batch_size=7)
+    assert stats["accounts"] == len(snapshot)
+    assert stats["skipped_items"] == 0
+
+    out = io.StringIO()
+    export_accounts(out, batch_size=7)
+    exported = json.loads(out.getvalue())
+    assert {nickname: {"credits": entry["credits"], "items": sorted(entry["items"])}
+            for nickname, entry in exported.items()} == snapshot
+
+
+def test_import_skips_items_missing_from_the_catalog():
+    stats = import_accounts(io.StringIO('{"dave": {"credits": 5, "items": ["potion", "dragon"]}}'))
+    assert stats["skipped_items"] == 1
+
+    out = io.StringIO()
+    export_accounts(out)
+    assert json.loads(out.getvalue()) == {"dave": {"credits": 5, "items": ["potion"]}}